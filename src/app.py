@@ -10,6 +10,8 @@ from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from src.config.app_config import settings
 from src.config.logging_config import setup_logging
 from src.routes import get_apps_router
+from src.transport.rabbitmq.producer import close_producer
+from src.utils.captcha_utils import close_captcha_client
 from src.utils.custom_session_store import CustomSessionStore
 from src.utils.files_utils import cleanup_session_file, cleanup_orphaned_files
 
@@ -71,12 +73,19 @@ def get_application() -> FastAPI:
     @application.on_event("startup")
     async def startup_event():
         logger.info("Running startup tasks...")
-        cleanup_orphaned_files(settings.TEMP_DIR, max_age_hours=24)
+        cleanup_orphaned_files(settings.TEMP_DIR, max_age_hours=settings.TEMP_MAX_AGE_HOURS)
         
         # Запускаем фоновую задачу очистки сессий
         asyncio.create_task(periodic_session_cleanup())
         logger.info("Background tasks started")
     
+    # Событие остановки: закрываем общие HTTP и RabbitMQ соединения
+    @application.on_event("shutdown")
+    async def shutdown_event():
+        logger.info("Running shutdown tasks...")
+        await close_captcha_client()
+        await close_producer()
+    
     application.include_router(get_apps_router())
 
     # Настройка обслуживания статических файлов
@@ -30,6 +30,9 @@ class Settings(BaseSettings):
     
     # Временная директория
     TEMP_DIR: str = "var/temp"
+    TEMP_MAX_AGE_HOURS: float = 24.0  # Возраст, после которого файл во временной директории считается "осиротевшим"
+    TEMP_CLEANUP_INTERVAL_MINUTES: int = 60  # Интервал периодической очистки временной директории воркером в минутах
+    TEMP_DIR_IS_NETWORK: bool = False  # Временная директория на сетевой ФС (NFS, S3-FUSE): удаление файлов выполняется в потоке
     
     # Настройки сессий
     SESSIONS_SECRET_KEY: str = "change_me_in_production_please"
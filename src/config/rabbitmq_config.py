@@ -22,8 +22,32 @@ class RabbitMQSettings(BaseSettings):
     RABBITMQ_REPLY_TO_QUEUE: str = "amq.rabbitmq.reply-to"
     
     # Настройки переподключения
-    RABBITMQ_RECONNECT_DELAY: int = 5  # секунд
+    RABBITMQ_RECONNECT_DELAY: int = 5  # секунд, начальная задержка экспоненциальной паузы
+    RABBITMQ_RECONNECT_MAX_DELAY: int = 60  # секунд, верхняя граница паузы между попытками
     RABBITMQ_MAX_RECONNECT_ATTEMPTS: int = 10  # 0 = бесконечно
+    RABBITMQ_CONNECT_TIMEOUT: float = 10.0  # секунд на одну попытку подключения
+    
+    # Максимальный размер пула каналов для публикации сообщений
+    RABBITMQ_MAX_CHANNEL_POOL_SIZE: int = 16
+    
+    # Количество сообщений, которые консьюмер получает и обрабатывает параллельно
+    RABBITMQ_PREFETCH: int = 16
+    
+    # Максимальное число RPC вызовов продюсера, ожидающих ответа одновременно
+    RABBITMQ_MAX_INFLIGHT: int = 1000
+    
+    # Пакетная публикация RPC запросов: окно накопления в секундах (0 = отключено)
+    # и максимальное число сообщений в пакете
+    RABBITMQ_PUBLISH_BATCH_WINDOW: float = 0.0
+    RABBITMQ_PUBLISH_BATCH_SIZE: int = 64
+    
+    # Публикация всех RPC запросов одной фоновой задачей через внутреннюю очередь
+    # (включается также автоматически при RABBITMQ_PUBLISH_BATCH_WINDOW > 0)
+    RABBITMQ_PUBLISH_SINGLE_WRITER: bool = False
+    
+    # Групповое подтверждение сообщений: размер пачки и максимальная задержка (секунд)
+    RABBITMQ_ACK_BATCH_SIZE: int = 8
+    RABBITMQ_ACK_FLUSH_INTERVAL: float = 0.05
 
     class Config:
         env_file = ".env"
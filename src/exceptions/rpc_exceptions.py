@@ -23,6 +23,16 @@ class ServiceExecutionError(RPCException):
     pass
 
 
+class InvalidParamsError(RPCException):
+    """Исключение, возникающее при некорректных параметрах вызова метода сервиса."""
+    pass
+
+
 class ConfigurationError(RPCException):
     """Исключение, возникающее при ошибке конфигурации сервиса."""
     pass
+
+
+class RPCOverloadError(RPCException):
+    """Исключение, возникающее при превышении лимита одновременных RPC вызовов."""
+    pass
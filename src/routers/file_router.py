@@ -1,25 +1,52 @@
 import os
-import uuid
-import asyncio
 import json
-from datetime import datetime, timezone
+import time
+import asyncio
 import logging
+import orjson
 from starlette.status   import HTTP_500_INTERNAL_SERVER_ERROR
+from starlette.requests import ClientDisconnect
 from fastapi            import APIRouter, HTTPException, UploadFile, Request, Depends, Form
 from fastapi.responses  import FileResponse, JSONResponse, StreamingResponse
 
-from src.transport.rabbitmq.producer import RPCProducer
-from src.config.app_config import settings
+from src.transport.rabbitmq.producer import RPCProducer, get_producer
 from src.utils.files_utils import get_file_extension_by_content_type
 from src.utils.sse_utils import get_sse_headers
-from src.utils.upload_utils import FileUploadService
+from src.utils.upload_utils import FileUploadService, iso_from_epoch
 from src.utils.sse_service_registry import sse_registry
-from src.utils.sse_formatter import SSEEventFormatter
+from src.utils.sse_formatter import SSEEventFormatter, coalesce_sse_events
 from src.dependencies import verify_captcha_token
 
 router = APIRouter(prefix='/files', tags=["files"])
 logger = logging.getLogger(__name__)
 
+# Готовое SSE событие критической ошибки /upload/stream: постоянная часть кодируется
+# один раз, при ошибке подставляется только error_details (через %s)
+_INTERNAL_ERROR_EVENT_TEMPLATE = SSEEventFormatter.format_event_bytes({
+    "progress": -1,
+    "stage": "error",
+    "status": "error",
+    "error": {
+        "code": "INTERNAL_ERROR",
+        "message": "Критическая ошибка сервера",
+        "stage_failed": "streaming",
+        "error_details": None
+    }
+}).replace(b'"error_details":null', b'"error_details":%s')
+
+# Готовое SSE событие ошибки сохранения файла /upload/stream (до начала стриминга)
+_SAVE_ERROR_EVENT = SSEEventFormatter.format_event_bytes({
+    "progress": -1,
+    "stage": "error",
+    "status": "error",
+    "error": {
+        "code": "FILE_SAVE_ERROR",
+        "message": "Не удалось сохранить загруженный файл",
+        "stage_failed": "upload",
+        "recoverable": True
+    }
+})
+
 
 @router.post("/upload")
 async def upload_file(
@@ -29,7 +56,8 @@ async def upload_file(
 ) -> JSONResponse:
     logger.info(f"File upload started. Filename: {file.filename}, Content-Type: {file.content_type}")
     
-    file_tmp_name = ''
+    temp_file_path = ''
+    file_service = FileUploadService()
     
     try:
         # Получаем сессию пользователя
@@ -42,37 +70,19 @@ async def upload_file(
             raise HTTPException(400, {"code": "file_download_pending", "detail": "Пожалуйста, скачайте предыдущий файл перед загрузкой нового."})
 
         session['pending'] = True
-    
-        temp_dir = settings.TEMP_DIR
         
-        if (os.path.exists(temp_dir) is False):
-            os.makedirs(temp_dir)
-            
-        if (session.get('last_uploaded_file')):
-            # Удаляем предыдущий временный файл, если он существует
-            previous_file_path = session['last_uploaded_file'].get("file_path", "")
-            if previous_file_path and os.path.exists(previous_file_path):
-                try:
-                    os.remove(previous_file_path)
-                    session['last_uploaded_file'] = None
-                    logger.info(f"Previous temporary file removed: {previous_file_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to remove previous temporary file `{previous_file_path}`: {str(e)}")
-
-        file_id = uuid.uuid4().hex  # Генерируем уникальный идентификатор файла
-        file_ext = get_file_extension_by_content_type(file.content_type if file.content_type else "")
+        # Удаляем предыдущий временный файл, если он существует
+        await file_service.cleanup_previous_file(session)
 
-        file_tmp_name = f"{file_id}.{file_ext}" if file_ext else file_id
-        file_name_without_ext, _ = os.path.splitext(file_tmp_name)
+        # Копирование файла на диск выполняется в потоке пула и не блокирует event loop,
+        # пока идут другие запросы и SSE потоки
+        # Для RPC вызова именем служит file_id (имя временного файла), а не исходное имя
+        file_id, temp_file_path, _, file_size = await file_service.save_uploaded_file(file, session)
+        file_ext = get_file_extension_by_content_type(file.content_type)
+        file_name_without_ext = file_id
 
-        temp_file_path = os.path.join(temp_dir, file_tmp_name)  # Временный путь для сохранения файла
-        with open(temp_file_path, "wb") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-        
-
-        producer: RPCProducer = RPCProducer()
-        await producer.connect()
+        # Общий продюсер процесса: соединение с RabbitMQ не открывается на каждый запрос
+        producer: RPCProducer = await get_producer()
         
         await producer.call(
             method="ml.execute",
@@ -92,8 +102,8 @@ async def upload_file(
             "file_path": temp_file_path,
             "content_type": file.content_type,
             "extension": file_ext,
-            "size": file.size,
-            "upload_time": datetime.now(timezone.utc).isoformat()
+            "size": file_size,
+            "upload_time": int(time.time())
         }
 
         session['pending'] = False
@@ -113,10 +123,7 @@ async def upload_file(
         try:
             session['last_uploaded_file'] = None
             
-            if (file_tmp_name and os.path.exists(file_tmp_name)):
-                os.remove(file_tmp_name)
-            
-            logger.info(f"Current temporary file removed: {file_tmp_name}")
+            await file_service.discard_file(temp_file_path)
         except Exception as e:
             pass
         
@@ -129,10 +136,7 @@ async def upload_file(
         try:
             session['last_uploaded_file'] = None
             
-            if (file_tmp_name and os.path.exists(file_tmp_name)):
-                os.remove(file_tmp_name)
-            
-            logger.info(f"Current temporary file removed: {file_tmp_name}")
+            await file_service.discard_file(temp_file_path)
         except Exception as e:
             pass
         
@@ -173,7 +177,7 @@ async def get_session_status(request: Request) -> JSONResponse:
             response_data["file"] = {
                 "filename": file_metadata.get("filename", ""),
                 "size": file_metadata.get("size", 0),
-                "upload_time": file_metadata.get("upload_time", "")
+                "upload_time": iso_from_epoch(file_metadata.get("upload_time"))
             }
         
         logger.info(f"Session status: pending={pending}, need_download={need_download}")
@@ -305,24 +309,46 @@ async def upload_file_stream(
             }
         )
     
-    # ВАЖНО: Читаем файл ДО создания генератора, т.к. после возврата StreamingResponse
-    # временный файл UploadFile будет закрыт FastAPI
-    file_content = await file.read()
+    file_service = FileUploadService()
+    
+    # ВАЖНО: Сохраняем файл ДО создания генератора, т.к. после возврата StreamingResponse
+    # временный файл UploadFile будет закрыт FastAPI. Файл копируется на диск блоками,
+    # без чтения целиком в память
+    try:
+        (
+            uploaded_file_id, uploaded_file_path, uploaded_name, uploaded_size
+        ) = await file_service.save_uploaded_file(
+            file, request.state.session.get_session()
+        )
+    except Exception as e:
+        # Частично записанный файл уже удален в save_uploaded_file;
+        # клиент получает ошибку тем же SSE событием, что и при сбое обработки
+        logger.error("Failed to save file for SSE upload: %s", e, exc_info=True)
+        
+        async def save_error_generator():
+            yield _SAVE_ERROR_EVENT
+        
+        return StreamingResponse(
+            save_error_generator(),
+            media_type="text/event-stream",
+            headers=get_sse_headers()
+        )
+    
+    # Размер берется по числу записанных байт, а не из UploadFile.size
     file_metadata = {
         "filename": file.filename,
         "content_type": file.content_type,
-        "size": file.size or len(file_content)
+        "size": uploaded_size
     }
     
     async def event_generator():
         session = None
         completed_successfully = False
-        temp_file_path = None
+        temp_file_path = uploaded_file_path
         result_file_path = None  # Путь к результату после ML обработки
-        file_id = None
+        file_id = uploaded_file_id
         
-        file_service = FileUploadService()
-        formatter = SSEEventFormatter()
+        format_event = SSEEventFormatter.format_event_bytes
         
         try:
             # Получаем сессию
@@ -331,6 +357,10 @@ async def upload_file_stream(
             # 1. Валидация состояния сессии
             validation_error = file_service.validate_session_state(session)
             if validation_error:
+                # Сохраненный заранее файл не нужен; сессию не трогаем
+                await file_service.discard_file(temp_file_path)
+                temp_file_path = None
+                
                 error_code, error_message = validation_error.split(":", 1)
                 error_msg = {
                     "progress": -1,
@@ -343,23 +373,20 @@ async def upload_file_stream(
                         "recoverable": True
                     }
                 }
-                yield formatter.format_event(error_msg)
+                yield format_event(error_msg)
                 return
             
             # Устанавливаем pending только после успешной валидации
             session['pending'] = True
             
-            # 2. Сохранение файла (используем заранее прочитанные данные)
-            file_id, temp_file_path = await file_service.save_uploaded_file_from_bytes(
-                file_content, file_metadata, session
-            )
+            # 2. Файл уже сохранен во временную директорию до начала стриминга
             
             # 3. Очистка предыдущих файлов
             await file_service.cleanup_previous_file(session)
             
             # 4. ПРЯМОЙ вызов ML сервиса через SSE registry (БЕЗ RabbitMQ!)
             filename = file_metadata.get("filename") or ""
-            file_name_without_ext = os.path.splitext(filename)[0] if filename else file_id
+            file_name_without_ext = uploaded_name
             
             logger.info(f"Starting ML service stream for: {filename}")
             
@@ -372,13 +399,13 @@ async def upload_file_stream(
                 }
             ):
                 # Проверяем успешное завершение и извлекаем путь к результату
-                if 'event: complete' in sse_event:
+                if b'event: complete' in sse_event:
                     completed_successfully = True
                     # Парсим SSE событие для извлечения пути к результату
                     try:
-                        # SSE формат: "event: complete\ndata: {...}\n\n"
-                        for line in sse_event.split('\n'):
-                            if line.startswith('data:'):
+                        # SSE формат: b"event: complete\ndata: {...}\n\n"
+                        for line in sse_event.split(b'\n'):
+                            if line.startswith(b'data:'):
                                 data_json = line[5:].strip()  # Убираем "data:" и пробелы
                                 event_data = json.loads(data_json)
                                 # Извлекаем путь к результату из result.path
@@ -390,8 +417,9 @@ async def upload_file_stream(
                     except (json.JSONDecodeError, KeyError) as e:
                         logger.warning(f"Failed to parse complete event: {e}")
                 
+                # Отдельный asyncio.sleep(0) не нужен: StreamingResponse отправляет каждое
+                # событие через await send(), что уже возвращает управление event loop
                 yield sse_event
-                await asyncio.sleep(0)
             
             # 5. Сохранение метаданных (используем путь к результату!)
             if completed_successfully:
@@ -413,8 +441,17 @@ async def upload_file_stream(
                 
                 logger.info(f"SSE upload completed successfully: {filename}")
                 
+        except asyncio.CancelledError:
+            # Отключение клиента - штатная ситуация: traceback не формируется,
+            # очистка выполняется в finally
+            logger.info("SSE upload cancelled")
+            raise
+        
         except Exception as e:
-            logger.error(f"Critical error in SSE upload: {e}", exc_info=True)
+            if isinstance(e, ClientDisconnect):
+                logger.info("SSE upload cancelled: client disconnected")
+            else:
+                logger.error("Critical error in SSE upload: %s", e, exc_info=True)
             
             # Cleanup при критической ошибке
             if session:
@@ -423,25 +460,14 @@ async def upload_file_stream(
                 if temp_file_path:
                     await file_service.cleanup_temp_file(temp_file_path, session)
             
-            error_msg = {
-                "progress": -1,
-                "stage": "error",
-                "status": "error",
-                "error": {
-                    "code": "INTERNAL_ERROR",
-                    "message": "Критическая ошибка сервера",
-                    "stage_failed": "streaming",
-                    "error_details": str(e)
-                }
-            }
-            yield formatter.format_event(error_msg)
+            yield _INTERNAL_ERROR_EVENT_TEMPLATE % orjson.dumps(str(e))
             
         finally:
             # КРИТИЧЕСКИ ВАЖНО: Cleanup при разрыве SSE соединения
             if session and not completed_successfully:
                 if session.get('pending', False):
                     filename = file_metadata.get("filename") or "unknown"
-                    logger.warning(f"SSE connection interrupted for file {filename}")
+                    logger.info("SSE connection interrupted for file %s", filename)
                     
                     session['pending'] = False
                     
@@ -449,8 +475,9 @@ async def upload_file_stream(
                     if not session.get('need_download', False) and temp_file_path:
                         await file_service.cleanup_temp_file(temp_file_path, session)
     
+    # События, пришедшие почти одновременно (частый прогресс ML), отправляются одной записью
     return StreamingResponse(
-        event_generator(),
+        coalesce_sse_events(event_generator()),
         media_type="text/event-stream",
         headers=get_sse_headers()
     )
@@ -102,7 +102,7 @@ async def s3_operation_stream(
     async def event_generator():
         temp_file_path = None
         completed_successfully = False
-        formatter = SSEEventFormatter()
+        format_event = SSEEventFormatter.format_event_bytes
         
         try:
             # Формируем параметры для сервиса
@@ -124,7 +124,7 @@ async def s3_operation_stream(
                             "recoverable": True
                         }
                     }
-                    yield formatter.format_event(error_msg)
+                    yield format_event(error_msg)
                     return
                 
                 # Сохраняем файл временно
@@ -158,7 +158,7 @@ async def s3_operation_stream(
                             "recoverable": True
                         }
                     }
-                    yield formatter.format_event(error_msg)
+                    yield format_event(error_msg)
                     return
                 
                 service_params["object_key"] = object_key
@@ -177,7 +177,7 @@ async def s3_operation_stream(
                             "recoverable": True
                         }
                     }
-                    yield formatter.format_event(error_msg)
+                    yield format_event(error_msg)
                     return
                 
                 service_params["object_key"] = object_key
@@ -196,7 +196,7 @@ async def s3_operation_stream(
                         "recoverable": True
                     }
                 }
-                yield formatter.format_event(error_msg)
+                yield format_event(error_msg)
                 return
             
             # ПРЯМОЙ вызов ya_s3 сервиса через SSE registry (БЕЗ RabbitMQ!)
@@ -207,13 +207,13 @@ async def s3_operation_stream(
                 params={"data": service_params}
             ):
                 # Проверяем успешное завершение
-                if 'event: complete' in sse_event:
+                if b'event: complete' in sse_event:
                     completed_successfully = True
                 
                 yield sse_event
                 
                 # Если ошибка - всё равно продолжаем (событие уже отправлено)
-                if 'event: error' in sse_event:
+                if b'event: error' in sse_event:
                     break
         
         except Exception as e:
@@ -231,7 +231,7 @@ async def s3_operation_stream(
                     "recoverable": False
                 }
             }
-            yield formatter.format_event(error_msg)
+            yield format_event(error_msg)
         
         finally:
             # Очищаем временный файл при загрузке
@@ -0,0 +1,3 @@
+from .ml_schemas import MLExecuteParams
+
+__all__ = ["MLExecuteParams"]
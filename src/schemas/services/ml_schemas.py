@@ -0,0 +1,23 @@
+"""
+Pydantic схемы параметров ML сервиса.
+"""
+
+from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class MLExecuteParams(BaseModel):
+    """
+    Параметры вызова ml.execute.
+    
+    Видео передается только путем к файлу. Содержимое файла в параметрах
+    (например, base64 строка в JSON) запрещено: кодирование больших видео в JSON
+    многократно увеличивает потребление памяти при сериализации и передаче через RabbitMQ.
+    """
+    
+    model_config = ConfigDict(extra='forbid')
+    
+    path: str = Field(..., min_length=1, max_length=4096, description="Путь к локальному видео файлу")
+    # Имя только информационное и берется из исходного имени загруженного файла,
+    # поэтому его длина не ограничивается
+    name: Optional[str] = Field(None, description="Имя файла без расширения")
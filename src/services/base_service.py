@@ -3,7 +3,7 @@
 import importlib
 import os
 import time
-from typing import AsyncIterator, Optional
+from typing import AsyncIterator, ClassVar, Optional
 from datetime import datetime, timezone
 from pydantic_settings import BaseSettings
 from src.utils.string_utils import to_snake_case
@@ -12,6 +12,11 @@ from src.services.service_stages import ServiceStageDefinition
 class BaseService:
     """Базовый класс для всех сервисов."""
     
+    # Является ли метод execute корутиной. Сервисы могут объявить это статически
+    # (True/False), чтобы диспетчер не проверял сигнатуру при регистрации.
+    # None - не объявлено, тип определяется через asyncio.iscoroutinefunction.
+    is_async: ClassVar[Optional[bool]] = None
+    
     def __init__(self, settings = BaseSettings()):
         self.__settings = settings
         self._start_time: Optional[float] = None
@@ -18,7 +18,10 @@ from urllib.parse import urlparse
 
 import httpx
 from httpx_sse import aconnect_sse
+from pydantic import ValidationError
 
+from src.exceptions.rpc_exceptions import InvalidParamsError
+from src.schemas.services.ml_schemas import MLExecuteParams
 from src.services.base_service import BaseService
 from src.services.ya_s3_service.ya_s3_service import YaS3Service
 from src.config.services.ml_config import settings
@@ -48,6 +51,8 @@ class MLService(BaseService):
     4. Скачивание результата из S3
     """
 
+    is_async = False
+
     # Маппинг прогресса для этапов
     PROGRESS_UPLOAD_START = 0
     PROGRESS_UPLOAD_END = 25
@@ -120,6 +125,10 @@ class MLService(BaseService):
                 - "status" (str): Статус выполнения ("success" или "error").
                 - "message" (str): Сообщение о результате.
                 - "result_path" (str): Путь к результирующему файлу.
+
+        Raises:
+            InvalidParamsError: Если параметры не соответствуют схеме MLExecuteParams
+                (например, передано содержимое файла вместо пути).
         """
         logger.info(f"MLService.execute called with data: {data}")
 
@@ -129,6 +138,13 @@ class MLService(BaseService):
             logger.error("❌ Путь к видео не указан")
             return {"status": "error", "message": "`path` missing"}
 
+        try:
+            MLExecuteParams.model_validate(data)
+        except ValidationError as e:
+            # Диспетчер превращает исключение в JSON-RPC ошибку -32602 Invalid params
+            logger.error(f"❌ Некорректные параметры ML сервиса: {e}")
+            raise InvalidParamsError(f"Invalid params: {e}") from e
+
         if not self.remote_url:
             logger.error("❌ remote_url не настроен")
             return {"status": "error", "message": "remote_url not configured"}
@@ -184,6 +200,18 @@ class MLService(BaseService):
                 )
                 return
             
+            # Принимается только путь к файлу: содержимое файла в параметрах запрещено схемой
+            try:
+                MLExecuteParams.model_validate(data)
+            except ValidationError as e:
+                yield self.create_error_message(
+                    error_code="INVALID_PARAMS",
+                    error_message="Некорректные параметры ML сервиса",
+                    stage_failed="validation",
+                    error_details=str(e)
+                )
+                return
+            
             file_path = Path(file_path_str)
             if not file_path.exists():
                 yield self.create_error_message(
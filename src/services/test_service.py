@@ -14,6 +14,8 @@ class TestService(BaseService):
     Конфигурация автоматически загружается из src/config/services/test_config.py
     """
     
+    is_async = False
+    
     def execute(self, data: dict) -> dict:
         """
         Тестовый метод, который принимает данные и возвращает результат.
@@ -42,6 +42,8 @@ class YaS3Service(BaseService):
     - Проверка целостности файлов (MD5 хеши)
     """
     
+    is_async = False
+    
     # Маппинг S3 ошибок в понятные сообщения
     S3_ERROR_CODES = {
         "NoSuchBucket": "Бакет не существует",
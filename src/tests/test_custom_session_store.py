@@ -0,0 +1,109 @@
+"""
+Unit тесты очистки истекших сессий в CustomSessionStore.
+
+Запуск тестов:
+    pytest src/tests/test_custom_session_store.py -v
+"""
+
+import time
+import logging
+
+import pytest
+
+from src.utils.custom_session_store import CustomSessionStore
+
+logger = logging.getLogger(__name__)
+
+# Время жизни сессии в тестах: 1 час
+LIFETIME_HOURS = 1.0
+LIFETIME_S = 3600
+
+
+@pytest.fixture
+def clock(monkeypatch) -> dict:
+    """
+    Управляемые часы: time.time() возвращает clock["now"].
+    """
+    clock = {"now": 1_000_000.0}
+    monkeypatch.setattr(time, "time", lambda: clock["now"])
+    return clock
+
+
+@pytest.fixture
+def deleted() -> list:
+    """Список сессий, для которых был вызван on_session_delete."""
+    return []
+
+
+@pytest.fixture
+def store(clock, deleted) -> CustomSessionStore:
+    """
+    Хранилище с большим порогом GC: очистка запускается только явным вызовом.
+    """
+    return CustomSessionStore(
+        on_session_delete=lambda session_id, data: deleted.append(session_id),
+        session_lifetime_hours=LIFETIME_HOURS,
+        gc_threshold=1000
+    )
+
+
+class TestCustomSessionStoreCleanup:
+    """
+    Тесты cleanup_old_sessions.
+    """
+
+    @pytest.mark.unit
+    def test_only_expired_sessions_removed(self, store, clock, deleted):
+        """
+        Удаляются только истекшие сессии, для каждой вызывается callback.
+        """
+        store.create_store("old")
+        clock["now"] += LIFETIME_S / 2
+        store.create_store("fresh")
+
+        clock["now"] += LIFETIME_S / 2 + 1
+        store.cleanup_old_sessions()
+
+        assert deleted == ["old"], f"Only the old session should be deleted: {deleted}"
+        assert "old" not in store.raw_memory_store, "Old session should be removed from store"
+        assert "fresh" in store.raw_memory_store, "Fresh session should stay in store"
+
+        logger.info("✓ Expired sessions cleanup test passed")
+
+    @pytest.mark.unit
+    def test_recreated_session_not_removed_by_stale_entry(self, store, clock, deleted):
+        """
+        Сессия, пересозданная с тем же ID, не удаляется по устаревшей записи кучи.
+        """
+        store.create_store("session")
+        clock["now"] += LIFETIME_S / 2
+        store.create_store("session")
+
+        clock["now"] += LIFETIME_S / 2 + 1
+        store.cleanup_old_sessions()
+
+        assert deleted == [], f"Recreated session should not be deleted: {deleted}"
+        assert "session" in store.raw_memory_store, "Recreated session should stay in store"
+
+        clock["now"] += LIFETIME_S / 2
+        store.cleanup_old_sessions()
+
+        assert deleted == ["session"], f"Session should be deleted once it expires: {deleted}"
+
+        logger.info("✓ Recreated session cleanup test passed")
+
+    @pytest.mark.unit
+    def test_session_deleted_elsewhere_is_skipped(self, store, clock, deleted):
+        """
+        Запись кучи для уже удаленной сессии пропускается без ошибки.
+        """
+        store.create_store("gone")
+        del store.raw_memory_store["gone"]
+
+        clock["now"] += LIFETIME_S + 1
+        store.cleanup_old_sessions()
+
+        assert deleted == [], f"Deleted session should not trigger callback: {deleted}"
+        assert not store._expiry_heap, "Expired heap entries should be popped"
+
+        logger.info("✓ Missing session cleanup test passed")
@@ -0,0 +1,165 @@
+"""
+Unit тесты валидации параметров ml.execute (MLExecuteParams).
+Удаленный ML сервис и S3 не вызываются.
+
+Запуск тестов:
+    pytest src/tests/test_ml_schemas.py -v
+"""
+
+import logging
+
+import orjson
+import pytest
+from pydantic import ValidationError
+
+from src.exceptions.rpc_exceptions import InvalidParamsError
+from src.schemas.services import MLExecuteParams
+from src.services.ml_service.ml_service import MLService
+from src.transport.json_rpc.dispatcher import JSONRPCDispatcher
+
+logger = logging.getLogger(__name__)
+
+# Код JSON-RPC ошибки "Invalid params"
+JSONRPC_INVALID_PARAMS = -32602
+
+
+@pytest.fixture
+def ml_service() -> MLService:
+    """
+    ML сервис без адреса удаленного сервиса: корректный вызов execute
+    проходит валидацию и останавливается до сетевого запроса.
+    """
+    service = MLService()
+    service.remote_url = ""
+    return service
+
+
+class TestMLExecuteParams:
+    """
+    Тесты схемы MLExecuteParams.
+    """
+
+    @pytest.mark.unit
+    def test_valid_params(self):
+        """
+        Тест корректных параметров: путь и необязательное имя.
+        """
+        params = MLExecuteParams.model_validate({"path": "/tmp/video.mp4", "name": "video"})
+
+        assert params.path == "/tmp/video.mp4", "Path should be preserved"
+        assert params.name == "video", "Name should be preserved"
+        assert MLExecuteParams.model_validate({"path": "/tmp/video.mp4"}).name is None, "Name should be optional"
+
+        logger.info("✓ Valid params test passed")
+
+    @pytest.mark.unit
+    def test_long_name_accepted(self):
+        """
+        Тест длинного имени: исходное имя файла пользователя не ограничивается по длине.
+        """
+        long_name = "видео " * 100
+
+        params = MLExecuteParams.model_validate({"path": "/tmp/video.mp4", "name": long_name})
+
+        assert params.name == long_name, "Long name should be preserved"
+
+        logger.info("✓ Long name test passed")
+
+    @pytest.mark.unit
+    def test_missing_path_rejected(self):
+        """
+        Тест отсутствующего пути.
+        """
+        with pytest.raises(ValidationError):
+            MLExecuteParams.model_validate({"name": "video"})
+
+        logger.info("✓ Missing path test passed")
+
+    @pytest.mark.unit
+    def test_extra_key_rejected(self):
+        """
+        Тест лишнего ключа: содержимое файла в параметрах запрещено.
+        """
+        with pytest.raises(ValidationError):
+            MLExecuteParams.model_validate({"path": "/tmp/video.mp4", "content": "AAAA"})
+
+        logger.info("✓ Extra key test passed")
+
+
+class TestMLServiceParamsValidation:
+    """
+    Тесты валидации параметров в MLService и JSON-RPC диспетчере.
+    """
+
+    @pytest.mark.unit
+    def test_execute_accepts_valid_params(self, ml_service):
+        """
+        Корректные параметры проходят валидацию (вызов останавливается
+        на проверке remote_url, а не на схеме).
+        """
+        result = ml_service.execute({"path": "/tmp/video.mp4", "name": "video"})
+
+        assert result == {"status": "error", "message": "remote_url not configured"}, f"Unexpected result: {result}"
+
+        logger.info("✓ Execute valid params test passed")
+
+    @pytest.mark.unit
+    def test_execute_missing_path(self, ml_service):
+        """
+        Отсутствующий путь по-прежнему возвращает ошибку `path` missing.
+        """
+        result = ml_service.execute({"name": "video"})
+
+        assert result == {"status": "error", "message": "`path` missing"}, f"Unexpected result: {result}"
+
+        logger.info("✓ Execute missing path test passed")
+
+    @pytest.mark.unit
+    def test_execute_rejects_extra_key(self, ml_service):
+        """
+        Лишний ключ в параметрах приводит к InvalidParamsError.
+        """
+        with pytest.raises(InvalidParamsError):
+            ml_service.execute({"path": "/tmp/video.mp4", "content": "AAAA"})
+
+        logger.info("✓ Execute extra key test passed")
+
+    @pytest.mark.unit
+    async def test_execute_stream_rejects_extra_key(self, ml_service):
+        """
+        Лишний ключ в параметрах execute_stream дает событие ошибки INVALID_PARAMS.
+        """
+        messages = [
+            message async for message in ml_service.execute_stream(
+                {"path": "/tmp/video.mp4", "content": "AAAA"}
+            )
+        ]
+
+        assert len(messages) == 1, f"Expected a single error message, got {messages}"
+        assert messages[0]["status"] == "error", "Message should be an error"
+        assert messages[0]["error"]["code"] == "INVALID_PARAMS", f"Unexpected error: {messages[0]}"
+
+        logger.info("✓ Execute stream extra key test passed")
+
+    @pytest.mark.unit
+    async def test_rpc_extra_key_returns_invalid_params(self):
+        """
+        Через JSON-RPC лишний ключ отклоняется стандартной ошибкой -32602 Invalid params.
+        """
+        dispatcher = JSONRPCDispatcher()
+        assert "ml.execute" in dispatcher.services, "MLService should be registered as 'ml.execute'"
+
+        request = orjson.dumps({
+            "jsonrpc": "2.0",
+            "method": "ml.execute",
+            "params": {"data": {"path": "/tmp/video.mp4", "content": "AAAA"}},
+            "id": 1
+        })
+
+        response = orjson.loads(await dispatcher.handle_request(request))
+
+        assert "error" in response, f"Response should contain error: {response}"
+        assert response["error"]["code"] == JSONRPC_INVALID_PARAMS, f"Unexpected error: {response['error']}"
+        assert response["id"] == 1, "Error should keep the request id"
+
+        logger.info("✓ RPC invalid params test passed")
@@ -0,0 +1,157 @@
+"""
+Unit тесты подтверждения сообщений в RPCConsumer.
+Используют поддельные сообщения, RabbitMQ не требуется.
+
+Запуск тестов:
+    pytest src/tests/test_rpc_consumer.py -v
+"""
+
+import logging
+
+import pytest
+
+from src.config.rabbitmq_config import rabbitmq_settings
+from src.transport.rabbitmq.consumer import RPCConsumer
+
+logger = logging.getLogger(__name__)
+
+
+class _FakeMessage:
+    """
+    Поддельное входящее сообщение: запоминает отправленные ack/nack.
+    """
+
+    def __init__(self, delivery_tag: int, redelivered: bool = False):
+        self.delivery_tag = delivery_tag
+        self.redelivered = redelivered
+        self.acks: list[bool] = []
+        self.nacks: list[bool] = []
+
+    async def ack(self, multiple: bool = False):
+        self.acks.append(multiple)
+
+    async def nack(self, requeue: bool = True):
+        self.nacks.append(requeue)
+
+
+@pytest.fixture
+def consumer(monkeypatch) -> RPCConsumer:
+    """
+    Консьюмер без соединения с RabbitMQ. Подтверждения отправляются
+    только явным вызовом _flush_acks.
+    """
+    monkeypatch.setattr(rabbitmq_settings, "RABBITMQ_ACK_BATCH_SIZE", 1000)
+    return RPCConsumer(connection_manager=object(), dispatcher=object())
+
+
+def _deliver(consumer: RPCConsumer, *messages: _FakeMessage):
+    """Регистрирует сообщения как доставленные, в порядке delivery_tag."""
+    consumer._unacked.extend(messages)
+
+
+class TestConsumerAcks:
+    """
+    Тесты группового и одиночного подтверждения сообщений.
+    """
+
+    @pytest.mark.unit
+    async def test_contiguous_prefix_acked_with_multiple(self, consumer):
+        """
+        Непрерывный префикс обработанных сообщений подтверждается одним ack(multiple=True).
+        """
+        messages = [_FakeMessage(tag) for tag in (1, 2, 3)]
+        _deliver(consumer, *messages)
+
+        for message in messages:
+            await consumer._settle(message, ack=True)
+        await consumer._flush_acks()
+
+        assert messages[0].acks == [] and messages[1].acks == [], "Prefix should be acked by the last message"
+        assert messages[2].acks == [True], "Last message of the prefix should be acked with multiple=True"
+        assert not consumer._unacked, "All messages should be removed from unacked"
+
+        logger.info("✓ Contiguous prefix ack test passed")
+
+    @pytest.mark.unit
+    async def test_out_of_order_messages_acked_individually(self, consumer):
+        """
+        Сообщения, завершившиеся раньше долгого предыдущего, подтверждаются сразу
+        и по отдельности, не дожидаясь его.
+        """
+        slow, fast_1, fast_2 = _FakeMessage(1), _FakeMessage(2), _FakeMessage(3)
+        _deliver(consumer, slow, fast_1, fast_2)
+
+        await consumer._settle(fast_1, ack=True)
+        await consumer._settle(fast_2, ack=True)
+        await consumer._flush_acks()
+
+        assert slow.acks == [], "Unfinished message should not be acked"
+        assert fast_1.acks == [False], "Out-of-order message should be acked individually"
+        assert fast_2.acks == [False], "Out-of-order message should be acked individually"
+        assert [m.delivery_tag for m in consumer._unacked] == [1], "Only the slow message should stay unacked"
+
+        # Долгое сообщение завершилось: подтверждается только оно
+        await consumer._settle(slow, ack=True)
+        await consumer._flush_acks()
+
+        assert slow.acks == [True], "Slow message should be acked once it finishes"
+        assert fast_1.acks == [False] and fast_2.acks == [False], "Acked messages should not be acked again"
+        assert not consumer._unacked, "All messages should be removed from unacked"
+
+        logger.info("✓ Out-of-order ack test passed")
+
+    @pytest.mark.unit
+    async def test_failed_message_requeued_on_first_delivery(self, consumer):
+        """
+        Сообщение, обработка которого упала при первой доставке, возвращается в очередь
+        и не подтверждается повторно через ack.
+        """
+        failed, ok = _FakeMessage(1), _FakeMessage(2)
+        _deliver(consumer, failed, ok)
+
+        await consumer._settle(failed, ack=False)
+        await consumer._settle(ok, ack=True)
+        await consumer._flush_acks()
+
+        assert failed.nacks == [True], "First delivery should be nacked with requeue=True"
+        assert failed.acks == [], "Nacked message should not be acked"
+        assert ok.acks == [True], "Following message should be acked with multiple=True"
+        assert not consumer._unacked, "All messages should be removed from unacked"
+
+        logger.info("✓ Nack with requeue test passed")
+
+    @pytest.mark.unit
+    async def test_failed_redelivered_message_not_requeued(self, consumer):
+        """
+        Повторно доставленное сообщение при сбое отклоняется без возврата в очередь,
+        чтобы оно не обрабатывалось по кругу.
+        """
+        redelivered = _FakeMessage(1, redelivered=True)
+        _deliver(consumer, redelivered)
+
+        await consumer._settle(redelivered, ack=False)
+        await consumer._flush_acks()
+
+        assert redelivered.nacks == [False], "Redelivered message should be nacked with requeue=False"
+        assert redelivered.acks == [], "Nacked message should not be acked"
+        assert not consumer._unacked, "Message should be removed from unacked"
+
+        logger.info("✓ Redelivered nack test passed")
+
+    @pytest.mark.unit
+    async def test_batch_size_triggers_flush(self, consumer, monkeypatch):
+        """
+        При накоплении RABBITMQ_ACK_BATCH_SIZE обработанных сообщений подтверждение
+        отправляется без ожидания периодического сброса.
+        """
+        monkeypatch.setattr(rabbitmq_settings, "RABBITMQ_ACK_BATCH_SIZE", 2)
+        first, second = _FakeMessage(1), _FakeMessage(2)
+        _deliver(consumer, first, second)
+
+        await consumer._settle(first, ack=True)
+        assert first.acks == [], "Ack should be deferred until the batch is full"
+
+        await consumer._settle(second, ack=True)
+        assert second.acks == [True], "Full batch should be acked with multiple=True"
+
+        logger.info("✓ Ack batch size test passed")
@@ -7,8 +7,13 @@ Unit тесты для RPC сервисов.
     pytest -m unit -v  # только unit тесты
 """
 
+import asyncio
+import threading
+import time
+
 import pytest
 import logging
+from jsonrpcserver.methods import global_methods
 
 from src.services.test_service import TestService
 from src.services.base_service import BaseService
@@ -18,6 +23,38 @@ from src.transport.json_rpc.service_loader import ServiceLoader
 logger = logging.getLogger(__name__)
 
 
+class _BlockingService(BaseService):
+    """
+    Синхронный сервис, блокирующий поток на время выполнения.
+    Запоминает поток, в котором был вызван execute.
+    """
+    
+    is_async = False
+    
+    def __init__(self):
+        super().__init__()
+        self.thread_id = None
+    
+    def execute(self, data: dict) -> dict:
+        self.thread_id = threading.get_ident()
+        time.sleep(0.2)
+        return {"status": "success"}
+
+
+@pytest.fixture
+def blocking_dispatcher():
+    """
+    Диспетчер с зарегистрированным методом "blocking.execute".
+    Метод регистрируется в глобальном реестре jsonrpcserver, поэтому
+    после теста он удаляется, чтобы не влиять на другие тесты.
+    """
+    dispatcher = JSONRPCDispatcher()
+    service = _BlockingService()
+    dispatcher._register_method("blocking.execute", service)
+    yield dispatcher, service
+    global_methods.pop("blocking.execute", None)
+
+
 class TestServiceUnit:
     """
     Unit тесты для TestService.
@@ -197,7 +234,7 @@ class TestJSONRPCDispatcher:
         logger.info(f"✓ Service registration test passed")
     
     @pytest.mark.unit
-    def test_dispatcher_handle_valid_request(self):
+    async def test_dispatcher_handle_valid_request(self):
         """
         Тест обработки валидного JSON-RPC запроса.
         """
@@ -211,16 +248,49 @@ class TestJSONRPCDispatcher:
             "id": 1
         }"""
         
-        response_str = dispatcher.handle_request(request)
+        response = await dispatcher.handle_request(request)
         
-        assert response_str is not None, "Response should not be None"
-        assert isinstance(response_str, str), "Response should be string"
+        assert response is not None, "Response should not be None"
+        assert isinstance(response, bytes), "Response should be bytes"
+        response_str = response.decode()
         assert "result" in response_str or "error" in response_str, "Response should contain result or error"
         
         logger.info(f"✓ Valid request handling test passed. Response: {response_str[:100]}...")
     
     @pytest.mark.unit
-    def test_dispatcher_handle_invalid_method(self):
+    async def test_dispatcher_sync_service_does_not_block_loop(self, blocking_dispatcher):
+        """
+        Тест, что синхронный сервис при await handle_request выполняется
+        в отдельном потоке и не блокирует event loop.
+        """
+        dispatcher, service = blocking_dispatcher
+        
+        # Пока сервис спит, event loop должен продолжать выполнять другие корутины
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        ticker_task = asyncio.create_task(ticker())
+        try:
+            response = await dispatcher.handle_request(
+                '{"jsonrpc": "2.0", "method": "blocking.execute", "params": {"data": {}}, "id": 1}'
+            )
+        finally:
+            ticker_task.cancel()
+        
+        assert b"result" in response, "Response should contain result"
+        assert service.thread_id is not None, "Service should be executed"
+        assert service.thread_id != threading.get_ident(), "Sync service should run in a worker thread"
+        assert ticks >= 5, f"Event loop should not be blocked, got {ticks} ticks"
+        
+        logger.info(f"✓ Sync service awaited path test passed. Ticks: {ticks}")
+    
+    @pytest.mark.unit
+    async def test_dispatcher_handle_invalid_method(self):
         """
         Тест обработки запроса с несуществующим методом.
         """
@@ -233,15 +303,16 @@ class TestJSONRPCDispatcher:
             "id": 2
         }"""
         
-        response_str = dispatcher.handle_request(request)
+        response = await dispatcher.handle_request(request)
         
-        assert response_str is not None, "Response should not be None"
+        assert response is not None, "Response should not be None"
+        response_str = response.decode()
         assert "error" in response_str, "Response should contain error"
         
         logger.info(f"✓ Invalid method handling test passed")
     
     @pytest.mark.unit
-    def test_dispatcher_handle_malformed_request(self):
+    async def test_dispatcher_handle_malformed_request(self):
         """
         Тест обработки некорректного JSON-RPC запроса.
         """
@@ -250,15 +321,16 @@ class TestJSONRPCDispatcher:
         # Некорректный JSON
         request = "not a valid json"
         
-        response_str = dispatcher.handle_request(request)
+        response = await dispatcher.handle_request(request)
         
-        assert response_str is not None, "Response should not be None"
+        assert response is not None, "Response should not be None"
+        response_str = response.decode()
         assert "error" in response_str, "Response should contain error for malformed request"
         
         logger.info(f"✓ Malformed request handling test passed")
     
     @pytest.mark.unit
-    def test_dispatcher_multiple_requests(self):
+    async def test_dispatcher_multiple_requests(self):
         """
         Тест обработки нескольких запросов подряд.
         """
@@ -272,8 +344,9 @@ class TestJSONRPCDispatcher:
                 "id": {i}
             }}"""
             
-            response_str = dispatcher.handle_request(request)
-            assert response_str is not None, f"Response {i} should not be None"
+            response = await dispatcher.handle_request(request)
+            assert response is not None, f"Response {i} should not be None"
+            response_str = response.decode()
             assert "result" in response_str, f"Response {i} should contain result"
         
         logger.info(f"✓ Multiple requests test passed")
@@ -309,7 +382,9 @@ class TestBaseService:
             ("TestService", "test"),
             ("VideoProcessingService", "video_processing"),
             ("MLService", "ml"),
-            ("MyCustomService", "my_custom")
+            ("MyCustomService", "my_custom"),
+            ("YaS3Service", "ya_s3"),
+            ("HTTPServerService", "http_server")
         ]
         
         for class_name, expected_name in test_cases:
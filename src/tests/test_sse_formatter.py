@@ -0,0 +1,154 @@
+"""
+Unit тесты объединения SSE событий (coalesce_sse_events).
+
+Запуск тестов:
+    pytest src/tests/test_sse_formatter.py -v
+"""
+
+import asyncio
+import logging
+
+import pytest
+
+from src.utils.sse_formatter import coalesce_sse_events
+
+logger = logging.getLogger(__name__)
+
+
+async def _events(*groups, pause: float = 0.05, state: dict = None):
+    """
+    Генератор событий: события внутри группы идут без пауз, между группами - пауза.
+    В state отмечается число выданных событий и выполнение finally.
+    """
+    state = state if state is not None else {}
+    state.setdefault("produced", 0)
+    try:
+        for index, group in enumerate(groups):
+            if index:
+                await asyncio.sleep(pause)
+            for event in group:
+                state["produced"] += 1
+                yield event
+    finally:
+        state["closed"] = True
+
+
+class TestCoalesceSSEEvents:
+    """
+    Тесты coalesce_sse_events.
+    """
+
+    @pytest.mark.unit
+    async def test_queued_events_are_batched(self):
+        """
+        События, накопившиеся в очереди, отправляются одним блоком,
+        событие после паузы - отдельным.
+        """
+        source = _events([b"a;", b"b;", b"c;"], [b"d;"], pause=0.05)
+
+        chunks = [chunk async for chunk in coalesce_sse_events(source)]
+
+        assert chunks == [b"a;b;c;", b"d;"], f"Unexpected chunks: {chunks}"
+
+        logger.info("✓ Coalesce queued events test passed")
+
+    @pytest.mark.unit
+    async def test_terminal_event_ends_batch(self):
+        """
+        Завершающее событие отправляется сразу, без событий, пришедших после него.
+        """
+        progress = b"event: progress\ndata: {}\n\n"
+        complete = b"event: complete\ndata: {}\n\n"
+        source = _events([progress, complete, b"tail;"])
+
+        chunks = [chunk async for chunk in coalesce_sse_events(source)]
+
+        assert chunks == [progress + complete, b"tail;"], f"Unexpected chunks: {chunks}"
+
+        logger.info("✓ Coalesce terminal event test passed")
+
+    @pytest.mark.unit
+    async def test_event_not_delayed(self):
+        """
+        Одиночное событие отправляется сразу, не дожидаясь следующего.
+        """
+        source = _events([b"first;"], [b"second;"], pause=10)
+        stream = coalesce_sse_events(source)
+
+        chunk = await asyncio.wait_for(stream.__anext__(), 0.5)
+        await stream.aclose()
+
+        assert chunk == b"first;", f"Unexpected chunk: {chunk}"
+
+        logger.info("✓ Coalesce no delay test passed")
+
+    @pytest.mark.unit
+    async def test_batch_limited_by_max_batch(self):
+        """
+        В один блок попадает не больше max_batch событий.
+        """
+        events = [b"%d;" % i for i in range(10)]
+        source = _events(events)
+
+        chunks = [chunk async for chunk in coalesce_sse_events(source, max_batch=4)]
+
+        assert len(chunks) == 3, f"Expected 3 chunks, got {chunks}"
+        assert b"".join(chunks) == b"".join(events), "All events should be delivered in order"
+        assert chunks[0] == b"".join(events[:4]), "First chunk should hold max_batch events"
+
+        logger.info("✓ Coalesce max_batch test passed")
+
+    @pytest.mark.unit
+    async def test_slow_reader_applies_backpressure(self):
+        """
+        Пока клиент не читает, исходный генератор не уходит вперед больше,
+        чем на размер очереди.
+        """
+        state = {}
+        source = _events([b"x;"] * 1000, state=state)
+        stream = coalesce_sse_events(source, max_batch=4)
+
+        await stream.__anext__()
+        await asyncio.sleep(0.05)
+
+        # Первый блок + заполненная очередь + одно событие, ожидающее места в очереди
+        assert state["produced"] <= 4 + 4 + 1, f"Source ran ahead: {state['produced']} events"
+
+        await stream.aclose()
+
+        logger.info("✓ Coalesce backpressure test passed")
+
+    @pytest.mark.unit
+    async def test_close_reaches_inner_generator(self):
+        """
+        Закрытие обертки (отключение клиента) закрывает исходный генератор,
+        и его finally выполняется до завершения aclose.
+        """
+        state = {}
+        source = _events([b"first;"], [b"second;"], pause=10, state=state)
+        stream = coalesce_sse_events(source)
+
+        assert await stream.__anext__() == b"first;"
+        await stream.aclose()
+
+        assert state.get("closed"), "Inner generator finally should run on close"
+
+        logger.info("✓ Coalesce cancellation test passed")
+
+    @pytest.mark.unit
+    async def test_source_error_is_raised_after_events(self):
+        """
+        Ошибка исходного генератора передается читателю после уже полученных событий.
+        """
+        async def failing():
+            yield b"ok;"
+            raise ValueError("boom")
+
+        chunks = []
+        with pytest.raises(ValueError, match="boom"):
+            async for chunk in coalesce_sse_events(failing()):
+                chunks.append(chunk)
+
+        assert chunks == [b"ok;"], "Events before the error should be delivered"
+
+        logger.info("✓ Coalesce error propagation test passed")
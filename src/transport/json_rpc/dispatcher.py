@@ -3,16 +3,124 @@ JSON-RPC диспетчер для обработки RPC запросов.
 Использует библиотеку jsonrpcserver для обработки JSON-RPC вызовов.
 """
 
+import asyncio
 import logging
-from typing import Dict, Any
-from jsonrpcserver import method, Success, Result, dispatch
+import sys
+from functools import partial
+from typing import Dict, Any, Union
+import orjson
+from jsonrpcserver import method, Success, InvalidParams, Result, async_dispatch
 from .service_loader import ServiceLoader
 from src.services.base_service import BaseService
-from src.exceptions.rpc_exceptions import ServiceExecutionError
+from src.exceptions.rpc_exceptions import InvalidParamsError, ServiceExecutionError
 
 logger = logging.getLogger(__name__)
 
 
+def _intern_method(request: Any) -> None:
+    """
+    Интернирует имя метода в разобранном JSON-RPC запросе, чтобы поиск
+    в реестре jsonrpcserver сравнивал строки по указателю.
+    
+    :param request: Разобранный запрос (dict одиночного запроса)
+    """
+    if isinstance(request, dict):
+        method_name = request.get("method")
+        if isinstance(method_name, str):
+            request["method"] = sys.intern(method_name)
+
+
+def _deserialize_request(request_body: Union[bytes, str]) -> Any:
+    """
+    Десериализатор для jsonrpcserver: разбирает тело запроса через orjson
+    и интернирует имена методов (в том числе в batch-запросах).
+    
+    :param request_body: Тело JSON-RPC запроса
+    :return: Разобранный запрос
+    """
+    parsed = orjson.loads(request_body)
+    if isinstance(parsed, list):
+        for request in parsed:
+            _intern_method(request)
+    else:
+        _intern_method(parsed)
+    return parsed
+
+
+async def _exec_wrapper(service: BaseService, method_name: str, data: dict) -> Result:
+    """
+    Обертка для вызова синхронного метода execute сервиса.
+    Привязывается к сервису через functools.partial при регистрации.
+    execute выполняется в пуле потоков, чтобы не блокировать event loop вызывающего.
+    
+    :param service: Экземпляр сервиса
+    :param method_name: Имя RPC метода
+    :param data: Данные для обработки сервисом
+    :return: Success с результатом выполнения сервиса или InvalidParams,
+        если сервис отклонил параметры (InvalidParamsError)
+    """
+    # Ленивое %-форматирование: строка собирается только если запись будет выведена,
+    # а дамп данных запроса/ответа дополнительно защищен проверкой уровня DEBUG
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    try:
+        logger.info("Executing RPC method: %s", method_name)
+        if debug_enabled:
+            logger.debug("Request data: %s", data)
+        
+        result = await asyncio.to_thread(service.execute, data)
+        
+        logger.info("RPC method %s executed successfully", method_name)
+        if debug_enabled:
+            logger.debug("Response data: %s", result)
+        
+        # Возвращаем Success объект, как требует jsonrpcserver
+        return Success(result)
+    
+    except InvalidParamsError as e:
+        # Ошибка клиента: возвращается стандартная JSON-RPC ошибка -32602 Invalid params
+        logger.warning("Invalid params for RPC method %s: %s", method_name, e)
+        return InvalidParams(str(e))
+    
+    except Exception as e:
+        logger.error("Error executing RPC method %s: %s", method_name, e, exc_info=True)
+        raise ServiceExecutionError(f"Service execution failed: {str(e)}")
+
+
+async def _async_exec_wrapper(service: BaseService, method_name: str, data: dict) -> Result:
+    """
+    Обертка для вызова асинхронного метода execute сервиса.
+    Привязывается к сервису через functools.partial при регистрации.
+    
+    :param service: Экземпляр сервиса
+    :param method_name: Имя RPC метода
+    :param data: Данные для обработки сервисом
+    :return: Success с результатом выполнения сервиса или InvalidParams,
+        если сервис отклонил параметры (InvalidParamsError)
+    """
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    try:
+        logger.info("Executing RPC method: %s", method_name)
+        if debug_enabled:
+            logger.debug("Request data: %s", data)
+        
+        result = await service.execute(data)
+        
+        logger.info("RPC method %s executed successfully", method_name)
+        if debug_enabled:
+            logger.debug("Response data: %s", result)
+        
+        return Success(result)
+    
+    except InvalidParamsError as e:
+        # Ошибка клиента: возвращается стандартная JSON-RPC ошибка -32602 Invalid params
+        logger.warning("Invalid params for RPC method %s: %s", method_name, e)
+        return InvalidParams(str(e))
+    
+    except Exception as e:
+        logger.error("Error executing RPC method %s: %s", method_name, e, exc_info=True)
+        raise ServiceExecutionError(f"Service execution failed: {str(e)}")
+
+
 class JSONRPCDispatcher:
     """
     Диспетчер для обработки JSON-RPC запросов.
@@ -36,7 +144,8 @@ class JSONRPCDispatcher:
         discovered_services = loader.discover_services()
         
         for service in discovered_services:
-            method_name = loader.get_service_method_name(service)
+            # Интернируем имя, чтобы оно совпадало по указателю с именами из запросов
+            method_name = sys.intern(loader.get_service_method_name(service))
             self.services[method_name] = service
             
             # Регистрируем метод в jsonrpcserver
@@ -53,51 +162,52 @@ class JSONRPCDispatcher:
         :param method_name: Имя RPC метода (например, "test.execute")
         :param service: Экземпляр сервиса
         """
-        @method(name=method_name)
-        def execute_wrapper(data: dict) -> Result:
-            """
-            Обертка для вызова метода execute сервиса.
-            
-            :param data: Данные для обработки сервисом
-            :return: Success с результатом выполнения сервиса
-            """
-            try:
-                logger.info(f"Executing RPC method: {method_name}")
-                logger.debug(f"Request data: {data}")
-                
-                result = service.execute(data)
-                
-                logger.info(f"RPC method {method_name} executed successfully")
-                logger.debug(f"Response data: {result}")
-                
-                # Возвращаем Success объект, как требует jsonrpcserver
-                return Success(result)
-            
-            except Exception as e:
-                logger.error(f"Error executing RPC method {method_name}: {e}", exc_info=True)
-                raise ServiceExecutionError(f"Service execution failed: {str(e)}")
+        # async_dispatch ожидает корутинные методы: для синхронного execute
+        # используется обертка, выполняющая его в потоке, для асинхронного - await.
+        # Если сервис не объявил is_async, определяем тип по сигнатуре execute.
+        is_async = service.is_async
+        if is_async is None:
+            is_async = asyncio.iscoroutinefunction(service.execute)
+        
+        if is_async:
+            wrapper = _async_exec_wrapper
+        else:
+            wrapper = _exec_wrapper
+        
+        # partial вместо замыкания: сервис и имя метода хранятся в самом объекте,
+        # без ячеек __closure__ на каждую обертку
+        wrapped = partial(wrapper, service, method_name)
+        method(wrapped, name=method_name)
     
-    def handle_request(self, request_body: str) -> str:
+    async def handle_request(self, request_body: Union[bytes, str]) -> bytes:
         """
         Обрабатывает входящий JSON-RPC запрос.
         
-        :param request_body: Тело JSON-RPC запроса в виде строки
-        :return: JSON-RPC ответ в виде строки
+        Ответ сериализуется через orjson сразу в bytes, поэтому транспорт
+        может отправлять его без дополнительного кодирования в UTF-8.
+        
+        :param request_body: Тело JSON-RPC запроса (bytes или строка)
+        :return: JSON-RPC ответ в виде bytes (пустой для notification-запросов)
         """
         try:
             logger.info("Handling JSON-RPC request")
-            logger.debug(f"Request body: {request_body}")
+            logger.debug("Request body: %s", request_body)
             
-            # Используем dispatch из jsonrpcserver для обработки запроса
-            response = dispatch(request_body)
+            # Используем async_dispatch из jsonrpcserver для обработки запроса
+            response = await async_dispatch(
+                request_body,
+                deserializer=_deserialize_request,
+                serializer=orjson.dumps
+            )
             
             logger.info("JSON-RPC request handled successfully")
-            logger.debug(f"Response: {response}")
+            logger.debug("Response: %s", response)
             
-            return response
+            # Для notification-запросов jsonrpcserver возвращает пустую строку
+            return response or b""
         
         except Exception as e:
-            logger.error(f"Error handling JSON-RPC request: {e}", exc_info=True)
+            logger.error("Error handling JSON-RPC request: %s", e, exc_info=True)
             # jsonrpcserver автоматически формирует error response
             raise
     
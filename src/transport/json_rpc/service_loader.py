@@ -15,6 +15,9 @@ from src.utils.string_utils import to_snake_case
 
 logger = logging.getLogger(__name__)
 
+# Директории, в которые не нужно спускаться при поиске сервисов
+_SKIP_DIRS = frozenset({"__pycache__", "node_modules"})
+
 
 class ServiceLoader:
     """
@@ -56,12 +59,21 @@ class ServiceLoader:
             logger.warning(f"Services directory not found: {self.services_dir}")
             return service_files
         
-        # Рекурсивный поиск файлов *_service.py
-        for file_path in self.services_dir.rglob("*_service.py"):
-            # Игнорируем base_service.py
-            if file_path.name != "base_service.py":
-                service_files.append(file_path)
-                logger.debug(f"Found service file: {file_path}")
+        # Рекурсивный обход через os.scandir: тип записи берется из readdir без
+        # лишних stat(), а служебные и скрытые директории (.venv, .git и т.п.) пропускаются
+        stack = [str(self.services_dir)]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if not name.startswith('.') and name not in _SKIP_DIRS:
+                            stack.append(entry.path)
+                    # Игнорируем base_service.py
+                    elif name.endswith("_service.py") and name != "base_service.py":
+                        file_path = Path(entry.path)
+                        service_files.append(file_path)
+                        logger.debug(f"Found service file: {file_path}")
         
         logger.info(f"Found {len(service_files)} service files")
         return service_files
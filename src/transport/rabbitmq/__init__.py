@@ -4,11 +4,13 @@
 """
 
 from .connection import ConnectionManager
-from .producer import RPCProducer
+from .producer import RPCProducer, get_producer, close_producer
 from .consumer import RPCConsumer
 
 __all__ = [
     'ConnectionManager',
     'RPCProducer',
+    'get_producer',
+    'close_producer',
     'RPCConsumer',
 ]
@@ -5,6 +5,7 @@
 
 import asyncio
 import logging
+import random
 from typing import Optional
 import aio_pika
 from aio_pika.abc import AbstractConnection, AbstractChannel
@@ -49,11 +50,22 @@ class ConnectionManager:
         
         try:
             logger.info("Connecting to RabbitMQ...")
-            self._connection = await aio_pika.connect_robust(self.url)
+            # Ограничиваем попытку по времени, чтобы зависший TCP connect не блокировал воркер
+            self._connection = await asyncio.wait_for(
+                aio_pika.connect_robust(self.url),
+                timeout=rabbitmq_settings.RABBITMQ_CONNECT_TIMEOUT
+            )
             self._reconnect_attempts = 0
             logger.info("Successfully connected to RabbitMQ")
             return self._connection
         
+        except asyncio.TimeoutError:
+            logger.error(
+                f"Failed to connect to RabbitMQ: timeout after "
+                f"{rabbitmq_settings.RABBITMQ_CONNECT_TIMEOUT} seconds"
+            )
+            raise AMQPConnectionError("Connection to RabbitMQ timed out")
+        
         except AMQPConnectionError as e:
             logger.error(f"Failed to connect to RabbitMQ: {e}")
             raise
@@ -71,20 +83,23 @@ class ConnectionManager:
         assert self._connection is not None, "Connection should be established"
         return self._connection
     
-    async def get_channel(self) -> AbstractChannel:
+    async def get_channel(self, publisher_confirms: bool = True) -> AbstractChannel:
         """
         Создает и возвращает новый канал из активного соединения.
         
+        :param publisher_confirms: Ожидать ли подтверждения брокера на каждую публикацию
         :return: Новый канал RabbitMQ
         """
         connection = await self.get_connection()
-        channel = await connection.channel()
+        channel = await connection.channel(publisher_confirms=publisher_confirms)
         logger.debug("New channel created")
         return channel
     
     async def reconnect(self) -> AbstractConnection:
         """
-        Попытка переподключения к RabbitMQ с задержкой и ограничением попыток.
+        Попытка переподключения к RabbitMQ с ограничением попыток.
+        Пауза между попытками растет экспоненциально до RABBITMQ_RECONNECT_MAX_DELAY
+        и рандомизируется, чтобы воркеры не переподключались к брокеру одновременно.
         
         :return: Объект подключения
         :raises AMQPConnectionError: Если исчерпаны все попытки переподключения
@@ -97,7 +112,7 @@ class ConnectionManager:
             )
             
             try:
-                await asyncio.sleep(rabbitmq_settings.RABBITMQ_RECONNECT_DELAY)
+                await asyncio.sleep(self._get_reconnect_delay())
                 return await self.connect()
             
             except AMQPConnectionError as e:
@@ -109,6 +124,16 @@ class ConnectionManager:
         
         raise AMQPConnectionError("Failed to reconnect to RabbitMQ")
     
+    def _get_reconnect_delay(self) -> float:
+        """
+        Вычисляет паузу перед текущей попыткой переподключения.
+        
+        :return: Задержка в секундах
+        """
+        backoff = rabbitmq_settings.RABBITMQ_RECONNECT_DELAY * 2 ** (self._reconnect_attempts - 1)
+        delay = min(rabbitmq_settings.RABBITMQ_RECONNECT_MAX_DELAY, backoff)
+        return delay * (0.5 + random.random())
+    
     async def close(self):
         """
         Закрывает соединение с RabbitMQ.
@@ -5,10 +5,15 @@ RabbitMQ консьюмер для обработки RPC запросов.
 
 import asyncio
 import logging
-from typing import Optional
+from collections import deque
+from functools import partial
+from typing import Deque, Dict, List, Optional, Set
+
+import orjson
 import aio_pika
 from aio_pika import Message
-from aio_pika.abc import AbstractIncomingMessage
+from aio_pika.abc import AbstractChannel, AbstractIncomingMessage
+from aio_pika.pool import Pool
 
 from .connection import ConnectionManager
 from src.config.rabbitmq_config import rabbitmq_settings
@@ -16,6 +21,11 @@ from src.transport.json_rpc.dispatcher import JSONRPCDispatcher
 
 logger = logging.getLogger(__name__)
 
+# Шаблон ответа JSON-RPC "Internal error"; подставляется только сериализованный текст ошибки
+_INTERNAL_ERROR_TEMPLATE = (
+    b'{"jsonrpc":"2.0","error":{"code":-32603,"message":"Internal error","data":%b},"id":null}'
+)
+
 
 class RPCConsumer:
     """
@@ -25,17 +35,48 @@ class RPCConsumer:
     для обработки и отправляет ответы обратно клиенту.
     """
 
-    def __init__(self, connection_manager: ConnectionManager = ConnectionManager(rabbitmq_settings.url), dispatcher: JSONRPCDispatcher = JSONRPCDispatcher()):
+    def __init__(
+        self,
+        connection_manager: Optional[ConnectionManager] = None,
+        dispatcher: Optional[JSONRPCDispatcher] = None
+    ):
         """
         Инициализация консьюмера.
         
-        :param connection_manager: Менеджер соединений с RabbitMQ
-        :param dispatcher: JSON-RPC диспетчер для обработки запросов
+        :param connection_manager: Менеджер соединений с RabbitMQ (по умолчанию создается новый)
+        :param dispatcher: JSON-RPC диспетчер для обработки запросов (по умолчанию создается новый)
         """
-        self.connection_manager = connection_manager
-        self.dispatcher = dispatcher
+        self.connection_manager = connection_manager or ConnectionManager(rabbitmq_settings.url)
+        self.dispatcher = dispatcher or JSONRPCDispatcher()
+        # Пул каналов для отправки ответов создается лениво внутри event loop
+        self._channel_pool: Optional[Pool[AbstractChannel]] = None
+        # Ограничивает число одновременно обрабатываемых сообщений размером prefetch
+        self._semaphore = asyncio.Semaphore(rabbitmq_settings.RABBITMQ_PREFETCH)
+        # Ссылки на фоновые задачи обработки, чтобы их не собрал сборщик мусора
+        self._tasks: Set[asyncio.Task] = set()
+        # Неподтвержденные сообщения в порядке доставки и итог их обработки
+        # (delivery_tag -> True для ack, False если сообщение уже отклонено)
+        self._unacked: Deque[AbstractIncomingMessage] = deque()
+        self._settled: Dict[int, bool] = {}
+        self._settled_since_flush = 0
         logger.info("RPCConsumer initialized")
     
+    def _get_channel_pool(self) -> Pool[AbstractChannel]:
+        """
+        Возвращает пул каналов для отправки ответов, создавая его при первом обращении.
+        Каналы открываются по требованию и переиспользуются между сообщениями.
+        Подтверждения публикации отключены: ответ в reply-to не требует гарантий
+        доставки, а ожидание подтверждения стоит лишнего обращения к брокеру.
+        
+        :return: Пул каналов RabbitMQ
+        """
+        if self._channel_pool is None:
+            self._channel_pool = Pool(
+                partial(self.connection_manager.get_channel, publisher_confirms=False),
+                max_size=rabbitmq_settings.RABBITMQ_MAX_CHANNEL_POOL_SIZE
+            )
+        return self._channel_pool
+    
     async def start_consuming(self):
         """
         Запускает процесс прослушивания очереди и обработки сообщений.
@@ -45,6 +86,9 @@ class RPCConsumer:
             # Подключаемся к RabbitMQ
             channel = await self.connection_manager.get_channel()
             
+            # Разрешаем брокеру держать у консьюмера до prefetch неподтвержденных сообщений
+            await channel.set_qos(prefetch_count=rabbitmq_settings.RABBITMQ_PREFETCH)
+            
             # Объявляем основную очередь для RPC запросов
             queue = await channel.declare_queue(
                 rabbitmq_settings.RABBITMQ_RPC_QUEUE,
@@ -53,101 +97,198 @@ class RPCConsumer:
             
             logger.info(f"Started consuming from queue: {rabbitmq_settings.RABBITMQ_RPC_QUEUE}")
             
-            # Начинаем слушать сообщения
-            await queue.consume(self.on_message)
+            # Начинаем слушать сообщения; подтверждения отправляются вручную пачками
+            await queue.consume(self.on_message, no_ack=False)
             
-            # Блокируемся навсегда (пока не будет сигнала остановки)
+            # Блокируемся навсегда (пока не будет сигнала остановки),
+            # периодически подтверждая обработанные сообщения
             logger.info("Consumer is running. Press Ctrl+C to stop.")
-            await asyncio.Event().wait()
+            await self._ack_flusher()
         
         except Exception as e:
             logger.error(f"Error in consumer: {e}", exc_info=True)
             raise
     
+    async def _ack_flusher(self):
+        """
+        Раз в RABBITMQ_ACK_FLUSH_INTERVAL секунд подтверждает накопленные сообщения,
+        чтобы неполная пачка не задерживалась при низкой нагрузке.
+        """
+        while True:
+            await asyncio.sleep(rabbitmq_settings.RABBITMQ_ACK_FLUSH_INTERVAL)
+            await self._flush_acks()
+    
+    async def _settle(self, message: AbstractIncomingMessage, ack: bool):
+        """
+        Отмечает сообщение обработанным.
+        Подтверждение откладывается до накопления пачки, отказ отправляется сразу
+        с возвратом в очередь, если сообщение доставлено впервые.
+        
+        :param message: Обработанное сообщение
+        :param ack: True при успешной обработке, False при сбое
+        """
+        if not ack:
+            try:
+                await message.nack(requeue=not message.redelivered)
+            except Exception as e:
+                logger.error(f"Error rejecting message: {e}")
+        
+        self._settled[message.delivery_tag] = ack
+        self._settled_since_flush += 1
+        if self._settled_since_flush >= rabbitmq_settings.RABBITMQ_ACK_BATCH_SIZE:
+            await self._flush_acks()
+    
+    async def _flush_acks(self):
+        """
+        Подтверждает обработанные сообщения.
+        Непрерывный префикс обработанных сообщений подтверждается одним basic.ack
+        с multiple=True. Сообщения, обработанные раньше предшествующих им (например,
+        пока выполняется долгий ml.execute), подтверждаются по отдельности:
+        иначе они занимали бы окно prefetch до завершения самого медленного запроса.
+        """
+        self._settled_since_flush = 0
+        if not self._settled:
+            return
+        
+        # Состояние меняется целиком до первого await, поэтому параллельные
+        # вызовы не подтверждают одно сообщение дважды
+        last_ack: Optional[AbstractIncomingMessage] = None
+        while self._unacked and self._unacked[0].delivery_tag in self._settled:
+            message = self._unacked.popleft()
+            if self._settled.pop(message.delivery_tag):
+                last_ack = message
+        
+        out_of_order: List[AbstractIncomingMessage] = []
+        if self._settled:
+            pending: Deque[AbstractIncomingMessage] = deque()
+            for message in self._unacked:
+                ack = self._settled.pop(message.delivery_tag, None)
+                if ack is None:
+                    pending.append(message)
+                elif ack:
+                    out_of_order.append(message)
+            self._unacked = pending
+        
+        if last_ack is not None:
+            try:
+                await last_ack.ack(multiple=True)
+            except Exception as e:
+                logger.error(f"Error acknowledging messages: {e}")
+        
+        for message in out_of_order:
+            try:
+                await message.ack()
+            except Exception as e:
+                logger.error(f"Error acknowledging message: {e}")
+    
     async def on_message(self, message: AbstractIncomingMessage):
         """
-        Callback для обработки каждого входящего сообщения.
+        Callback для каждого входящего сообщения.
+        Запускает обработку в фоновой задаче, чтобы сообщения из prefetch
+        обрабатывались параллельно. Если все слоты заняты, ждет освобождения.
         
         :param message: Входящее сообщение из RabbitMQ
         """
-        async with message.process():
-            try:
-                # Декодируем тело сообщения
-                request_body = message.body.decode()
-                logger.info(f"Received RPC request. Correlation ID: {message.correlation_id}")
-                logger.debug(f"Request body: {request_body}")
-                
-                # Обрабатываем JSON-RPC запрос через диспетчер
-                response_body = self.dispatcher.handle_request(request_body)
-                
-                logger.info(f"RPC request processed. Correlation ID: {message.correlation_id}")
-                logger.debug(f"Response body: {response_body}")
-                
-                # Если клиент указал reply_to, отправляем ответ
-                if message.reply_to:
-                    await self._send_response(
-                        message.reply_to,
-                        response_body,
-                        message.correlation_id
-                    )
-                else:
-                    logger.warning("No reply_to address specified. Response will not be sent.")
+        # Порядок в очереди неподтвержденных совпадает с порядком delivery_tag
+        self._unacked.append(message)
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._process_message(message))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+    
+    def _on_task_done(self, task: asyncio.Task):
+        """
+        Освобождает слот обработки после завершения фоновой задачи.
+        
+        :param task: Завершившаяся задача обработки сообщения
+        """
+        self._tasks.discard(task)
+        self._semaphore.release()
+    
+    async def _process_message(self, message: AbstractIncomingMessage):
+        """
+        Обрабатывает входящее сообщение и передает его на групповое подтверждение.
+        
+        :param message: Входящее сообщение из RabbitMQ
+        """
+        try:
+            await self._handle_message(message)
+        except Exception as e:
+            logger.error(f"Unexpected error while handling message: {e}", exc_info=True)
+            await self._settle(message, ack=False)
+        else:
+            await self._settle(message, ack=True)
+    
+    async def _handle_message(self, message: AbstractIncomingMessage):
+        """
+        Выполняет JSON-RPC запрос из сообщения и отправляет ответ.
+        
+        :param message: Входящее сообщение из RabbitMQ
+        """
+        try:
+            # Передаем тело сообщения диспетчеру как есть (bytes), без декодирования
+            request_body = message.body
+            logger.info("Received RPC request. Correlation ID: %s", message.correlation_id)
+            logger.debug("Request body: %s", request_body)
             
-            except Exception as e:
-                logger.error(f"Error processing message: {e}", exc_info=True)
-                
-                # Пытаемся отправить ошибку клиенту, если указан reply_to
-                if message.reply_to:
-                    error_response = {
-                        "jsonrpc": "2.0",
-                        "error": {
-                            "code": -32603,
-                            "message": "Internal error",
-                            "data": str(e)
-                        },
-                        "id": None
-                    }
-                    import json
-                    await self._send_response(
-                        message.reply_to,
-                        json.dumps(error_response),
-                        message.correlation_id
-                    )
+            # Обрабатываем JSON-RPC запрос на event loop консьюмера: синхронные
+            # сервисы диспетчер сам выполняет в пуле потоков
+            response_body = await self.dispatcher.handle_request(request_body)
+            
+            logger.info("RPC request processed. Correlation ID: %s", message.correlation_id)
+            logger.debug("Response body: %s", response_body)
+            
+            # Если клиент указал reply_to, отправляем ответ
+            if message.reply_to:
+                await self._send_response(
+                    message.reply_to,
+                    response_body,
+                    message.correlation_id
+                )
+            else:
+                logger.warning("No reply_to address specified. Response will not be sent.")
+        
+        except Exception as e:
+            logger.error(f"Error processing message: {e}", exc_info=True)
+            
+            # Пытаемся отправить ошибку клиенту, если указан reply_to
+            if message.reply_to:
+                await self._send_response(
+                    message.reply_to,
+                    _INTERNAL_ERROR_TEMPLATE % orjson.dumps(str(e)),
+                    message.correlation_id
+                )
     
     async def _send_response(
         self,
         reply_to: str,
-        response_body: str,
+        response_body: bytes,
         correlation_id: Optional[str]
     ):
         """
         Отправляет ответ обратно клиенту.
         
         :param reply_to: Адрес очереди для ответа
-        :param response_body: Тело ответа в формате JSON
+        :param response_body: Тело ответа в формате JSON (bytes)
         :param correlation_id: ID корреляции для связывания запроса и ответа
         """
         try:
-            channel = await self.connection_manager.get_channel()
-            
             # Формируем сообщение с ответом
             response_message = Message(
-                body=response_body.encode(),
+                body=response_body,
                 correlation_id=correlation_id,
                 content_type='application/json'
             )
             
-            # Отправляем в указанную очередь (обычно amq.rabbitmq.reply-to)
-            await channel.default_exchange.publish(
-                response_message,
-                routing_key=reply_to
-            )
+            # Берем канал из пула вместо открытия нового на каждый ответ
+            async with self._get_channel_pool().acquire() as channel:
+                # Отправляем в указанную очередь (обычно amq.rabbitmq.reply-to)
+                await channel.default_exchange.publish(
+                    response_message,
+                    routing_key=reply_to
+                )
             
-            logger.info(f"Response sent to {reply_to}. Correlation ID: {correlation_id}")
+            logger.info("Response sent to %s. Correlation ID: %s", reply_to, correlation_id)
         
         except Exception as e:
             logger.error(f"Error sending response: {e}", exc_info=True)
-
-
-# Необходимо импортировать asyncio для Event
-import asyncio
@@ -4,19 +4,28 @@ RabbitMQ продюсер для отправки RPC запросов.
 """
 
 import asyncio
+import itertools
 import logging
-import uuid
-from typing import Dict, Optional
-import json
+import secrets
+from functools import partial
+from typing import Dict, Optional, Set, Tuple
+
+import orjson
 
 from aio_pika import Message
-from aio_pika.abc import AbstractIncomingMessage, AbstractQueue
+from aio_pika.abc import AbstractChannel, AbstractIncomingMessage, AbstractQueue
+from aio_pika.pool import Pool
 
 from .connection import ConnectionManager
 from src.config.rabbitmq_config import rabbitmq_settings
+from src.exceptions.rpc_exceptions import RPCOverloadError
 
 logger = logging.getLogger(__name__)
 
+# Общий продюсер процесса: соединение и очередь ответов переиспользуются между запросами
+_producer: Optional["RPCProducer"] = None
+_producer_lock = asyncio.Lock()
+
 
 class RPCProducer:
     """
@@ -27,31 +36,68 @@ class RPCProducer:
     - correlation_id для связывания запросов и ответов
     """
     
-    def __init__(self, connection_manager: ConnectionManager = ConnectionManager(rabbitmq_settings.url)):
+    def __init__(self, connection_manager: Optional[ConnectionManager] = None):
         """
         Инициализация продюсера.
         
-        :param connection_manager: Менеджер соединений с RabbitMQ
+        :param connection_manager: Менеджер соединений с RabbitMQ (по умолчанию создается новый)
         """
-        self.connection_manager = connection_manager
+        self.connection_manager = connection_manager or ConnectionManager(rabbitmq_settings.url)
         self._futures: Dict[str, asyncio.Future] = {}
-        self._lock = asyncio.Lock()
+        # correlation_id уникален в пределах продюсера: случайный префикс + счетчик
+        self._id_prefix = secrets.token_hex(4)
+        self._id_counter = itertools.count()
         self._callback_queue: Optional[AbstractQueue] = None
         self._consumer_tag: Optional[str] = None
         self._channel = None
+        # Пул каналов для публикации запросов (создается при первом обращении).
+        # Канал берется только на время публикации и подтверждения брокера,
+        # а не на время ожидания ответа, поэтому размер пула не ограничивает
+        # число одновременных вызовов
+        self._channel_pool: Optional[Pool[AbstractChannel]] = None
         self._reply_to_queue_name: Optional[str] = None
+        # Имя очереди запросов читается из настроек один раз, а не на каждую публикацию
+        self._rpc_queue: str = rabbitmq_settings.RABBITMQ_RPC_QUEUE
+        # Публикации, для которых еще не пришло подтверждение брокера
+        self._pending_publishes: Set[asyncio.Task] = set()
+        # Очередь сообщений и единственная фоновая задача, публикующая из нее
+        # (используются при RABBITMQ_PUBLISH_SINGLE_WRITER или RABBITMQ_PUBLISH_BATCH_WINDOW > 0)
+        self._outgoing: Optional[asyncio.Queue[Tuple[Message, str]]] = None
+        self._flusher: Optional[asyncio.Task] = None
+        # Одноразовая блокировка инициализации: защищает от параллельного connect()
+        self._connect_lock = asyncio.Lock()
         logger.info("RPCProducer initialized")
     
     async def connect(self):
         """
         Инициализация продюсера и создание временной очереди для ответов.
-        Должен быть вызван перед использованием метода call().
+        Вызывать явно не обязательно: call() подключается при первом обращении.
+        """
+        await self._ensure_connected()
+    
+    async def _ensure_connected(self):
+        """
+        Лениво инициализирует канал и очередь ответов один раз за время жизни продюсера.
+        Повторные вызовы возвращаются сразу, без обращения к брокеру.
+        """
+        if self._channel is not None:
+            return
+        
+        async with self._connect_lock:
+            # Повторная проверка: канал мог быть создан, пока мы ждали блокировку
+            if self._channel is not None:
+                return
+            await self._setup_reply_queue()
+    
+    async def _setup_reply_queue(self):
+        """
+        Открывает канал, создает временную очередь для ответов и подписывается на нее.
         """
-        self._channel = await self.connection_manager.get_channel()
+        channel = await self.connection_manager.get_channel()
         
         # Создаем временную эксклюзивную очередь для получения ответов
         # Эта очередь будет автоматически удалена при закрытии соединения
-        self._callback_queue = await self._channel.declare_queue(
+        self._callback_queue = await channel.declare_queue(
             name='',  # Пустое имя - RabbitMQ сгенерирует уникальное имя
             exclusive=True,  # Только это соединение может использовать очередь
             auto_delete=True  # Очередь удалится при закрытии соединения
@@ -66,58 +112,101 @@ class RPCProducer:
             no_ack=True
         )
         
+        # Канал публикуется последним, чтобы _ensure_connected не пропустил
+        # незавершенную инициализацию
+        self._channel = channel
+        
+        single_writer = (
+            rabbitmq_settings.RABBITMQ_PUBLISH_SINGLE_WRITER
+            or rabbitmq_settings.RABBITMQ_PUBLISH_BATCH_WINDOW > 0
+        )
+        if single_writer and self._flusher is None:
+            self._outgoing = asyncio.Queue()
+            self._flusher = asyncio.create_task(self._flush_outgoing())
+        
         logger.info(f"RPCProducer connected. Reply queue: {self._reply_to_queue_name}")
     
-    async def call(self, method: str, params: dict, timeout: float = 30.0) -> dict:
+    def _get_channel_pool(self) -> Pool[AbstractChannel]:
+        """
+        Возвращает пул каналов для публикации запросов, создавая его при первом обращении.
+        Все каналы открываются на одном соединении, поэтому ответы по-прежнему
+        приходят в эксклюзивную очередь ответов продюсера.
+        
+        :return: Пул каналов RabbitMQ
+        """
+        if self._channel_pool is None:
+            self._channel_pool = Pool(
+                self.connection_manager.get_channel,
+                max_size=rabbitmq_settings.RABBITMQ_MAX_CHANNEL_POOL_SIZE
+            )
+        return self._channel_pool
+    
+    async def call(
+        self,
+        method: str,
+        params: dict,
+        timeout: float = 30.0
+    ) -> dict:
         """
         Выполняет RPC вызов удаленного метода.
         
         :param method: Имя метода для вызова (например, "test.execute")
-        :param params: Параметры метода
+        :param params: Параметры метода. Файлы передаются путем, а не содержимым:
+            base64 в JSON многократно увеличивает расход памяти (для ml.execute
+            это проверяет схема MLExecuteParams)
         :param timeout: Таймаут ожидания ответа в секундах
         :return: Результат выполнения метода
         :raises TimeoutError: Если ответ не получен в течение timeout
+        :raises RPCOverloadError: Если превышен лимит одновременных вызовов
+        :raises ConnectionError: Если продюсер закрыт до получения ответа
         :raises Exception: При ошибке выполнения метода
         """
-        # Используем блокировку для предотвращения одновременных вызовов
-        async with self._lock:
-            # Генерируем уникальный correlation_id
-            correlation_id = str(uuid.uuid4())
+        # Ограничиваем число ожидающих вызовов, чтобы при массовых таймаутах
+        # словарь Future не рос без предела
+        if len(self._futures) >= rabbitmq_settings.RABBITMQ_MAX_INFLIGHT:
+            logger.error(f"Too many in-flight RPC requests. Method: {method}")
+            raise RPCOverloadError(
+                f"Too many in-flight RPC requests (limit: {rabbitmq_settings.RABBITMQ_MAX_INFLIGHT})"
+            )
+        
+        # Запросы не сериализуются: ответы сопоставляются по correlation_id,
+        # поэтому несколько вызовов могут выполняться на канале одновременно.
+        # Генерируем уникальный correlation_id
+        correlation_id = f"{self._id_prefix}-{next(self._id_counter)}"
+        
+        # Создаем Future для ожидания ответа
+        future = asyncio.get_running_loop().create_future()
+        self._futures[correlation_id] = future
+        
+        try:
+            # Формируем JSON-RPC запрос
+            request_body = {
+                "jsonrpc": "2.0",
+                "method": method,
+                "params": params,
+                "id": correlation_id
+            }
+            
+            logger.info("Sending RPC request. Method: %s, ID: %s", method, correlation_id)
+            logger.debug("Request: %s", request_body)
             
-            # Создаем Future для ожидания ответа
-            loop = asyncio.get_event_loop()
-            future = loop.create_future()
-            self._futures[correlation_id] = future
+            # Отправляем сообщение в основную очередь
+            await self._publish_request(request_body, correlation_id)
             
+            # Ждем ответа с таймаутом
             try:
-                # Формируем JSON-RPC запрос
-                request_body = {
-                    "jsonrpc": "2.0",
-                    "method": method,
-                    "params": params,
-                    "id": correlation_id
-                }
-                
-                logger.info(f"Sending RPC request. Method: {method}, ID: {correlation_id}")
-                logger.debug(f"Request: {request_body}")
-                
-                # Отправляем сообщение в основную очередь
-                await self._publish_request(request_body, correlation_id)
-                
-                # Ждем ответа с таймаутом
-                try:
-                    response = await asyncio.wait_for(future, timeout=timeout)
-                    logger.info(f"Received RPC response. ID: {correlation_id}")
-                    logger.debug(f"Response: {response}")
-                    return response
-                
-                except asyncio.TimeoutError:
-                    logger.error(f"RPC request timeout. Method: {method}, ID: {correlation_id}")
-                    raise TimeoutError(f"RPC call timeout after {timeout} seconds")
+                response = await asyncio.wait_for(future, timeout=timeout)
+                logger.info("Received RPC response. ID: %s", correlation_id)
+                logger.debug("Response: %s", response)
+                return response
             
-            finally:
-                # Очищаем Future из словаря
-                self._futures.pop(correlation_id, None)
+            except asyncio.TimeoutError:
+                logger.error(f"RPC request timeout. Method: {method}, ID: {correlation_id}")
+                raise TimeoutError(f"RPC call timeout after {timeout} seconds")
+        
+        finally:
+            # Очищаем Future из словаря
+            self._futures.pop(correlation_id, None)
     
     async def _publish_request(self, request_body: dict, correlation_id: str):
         """
@@ -126,24 +215,130 @@ class RPCProducer:
         :param request_body: Тело JSON-RPC запроса
         :param correlation_id: ID корреляции для связывания запроса и ответа
         """
-        if not self._channel:
-            raise RuntimeError("Producer not connected. Call connect() first.")
+        await self._ensure_connected()
         
         # Формируем сообщение
         message = Message(
-            body=json.dumps(request_body).encode(),
+            body=orjson.dumps(request_body),
             correlation_id=correlation_id,
             reply_to=self._reply_to_queue_name,  # Используем имя нашей временной очереди
             content_type='application/json'
         )
         
-        # Публикуем в основную очередь запросов
-        await self._channel.default_exchange.publish(
-            message,
-            routing_key=rabbitmq_settings.RABBITMQ_RPC_QUEUE
-        )
+        # В режиме одной публикующей задачи сообщение уходит в ее очередь
+        if self._outgoing is not None:
+            self._outgoing.put_nowait((message, correlation_id))
+            return
+        
+        self._start_publish(message, correlation_id)
+    
+    def _start_publish(self, message: Message, correlation_id: str):
+        """
+        Публикует сообщение в основную очередь запросов, не дожидаясь подтверждения брокера:
+        подтверждения обрабатываются в фоне, а call() сразу переходит к ожиданию ответа.
+        
+        :param message: Сообщение с JSON-RPC запросом
+        :param correlation_id: ID корреляции для связывания запроса и ответа
+        """
+        publish_task = asyncio.ensure_future(self._publish_pooled(message))
+        self._pending_publishes.add(publish_task)
+        publish_task.add_done_callback(partial(self._on_publish_confirmed, correlation_id))
         
-        logger.debug(f"Request published to {rabbitmq_settings.RABBITMQ_RPC_QUEUE}")
+        logger.debug("Request published to %s", self._rpc_queue)
+    
+    async def _publish_pooled(self, message: Message):
+        """
+        Публикует сообщение через канал из пула. Канал возвращается в пул сразу
+        после подтверждения брокера, так что параллельные публикации
+        не ждут друг друга на одном канале.
+        
+        :param message: Сообщение с JSON-RPC запросом
+        """
+        async with self._get_channel_pool().acquire() as channel:
+            await channel.default_exchange.publish(
+                message,
+                routing_key=self._rpc_queue
+            )
+    
+    async def _flush_outgoing(self):
+        """
+        Единственная фоновая задача, публикующая запросы основного канала.
+        Вызовы call() из разных корутин только кладут сообщения в очередь, а в канал
+        пишет одна задача. Получив первое сообщение, ждет RABBITMQ_PUBLISH_BATCH_WINDOW
+        секунд (если окно задано), затем публикует накопленные сообщения (не более
+        RABBITMQ_PUBLISH_BATCH_SIZE) по порядку и дожидается подтверждений брокера
+        для всего пакета, прежде чем взять следующий. Ошибка публикации передается
+        в Future соответствующего вызова.
+        """
+        window = rabbitmq_settings.RABBITMQ_PUBLISH_BATCH_WINDOW
+        while True:
+            batch = [await self._outgoing.get()]
+            if window > 0:
+                await asyncio.sleep(window)
+            
+            while len(batch) < rabbitmq_settings.RABBITMQ_PUBLISH_BATCH_SIZE and not self._outgoing.empty():
+                batch.append(self._outgoing.get_nowait())
+            
+            # gather запускает публикации в порядке пакета: кадры уходят в канал
+            # последовательно, а подтверждения ожидаются вместе
+            exchange = self._channel.default_exchange
+            results = await asyncio.gather(
+                *(exchange.publish(message, routing_key=self._rpc_queue) for message, _ in batch),
+                return_exceptions=True
+            )
+            
+            for (_, correlation_id), result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    self._fail_call(correlation_id, result)
+    
+    def _on_publish_confirmed(self, correlation_id: str, publish_task: asyncio.Task):
+        """
+        Callback завершения публикации запроса.
+        Если брокер отклонил сообщение, ожидающий ответа вызов завершается ошибкой.
+        
+        :param correlation_id: ID корреляции опубликованного запроса
+        :param publish_task: Завершившаяся задача публикации
+        """
+        self._pending_publishes.discard(publish_task)
+        
+        if publish_task.cancelled():
+            return
+        
+        error = publish_task.exception()
+        if error is None:
+            return
+        
+        self._fail_call(correlation_id, error)
+    
+    def _fail_call(self, correlation_id: str, error: BaseException):
+        """
+        Завершает ожидающий вызов ошибкой публикации запроса.
+        
+        :param correlation_id: ID корреляции опубликованного запроса
+        :param error: Ошибка публикации
+        """
+        logger.error(f"Failed to publish RPC request. ID: {correlation_id}. Error: {error}")
+        future = self._futures.get(correlation_id)
+        if future is not None and not future.done():
+            future.set_exception(error)
+    
+    def _fail_pending_calls(self, error: BaseException):
+        """
+        Завершает ошибкой все ожидающие вызовы: и те, чьи сообщения еще лежат
+        в очереди публикации, и те, что ждут ответа.
+        
+        :param error: Ошибка, передаваемая в Future вызовов
+        """
+        if self._outgoing is not None:
+            while not self._outgoing.empty():
+                _, correlation_id = self._outgoing.get_nowait()
+                future = self._futures.get(correlation_id)
+                if future is not None and not future.done():
+                    future.set_exception(error)
+        
+        for future in self._futures.values():
+            if not future.done():
+                future.set_exception(error)
     
     async def _on_response(self, message: AbstractIncomingMessage):
         """
@@ -151,9 +346,8 @@ class RPCProducer:
         
         :param message: Входящее сообщение с ответом
         """
+        correlation_id = message.correlation_id
         try:
-            correlation_id = message.correlation_id
-            
             if not correlation_id:
                 logger.warning("Received response without correlation_id")
                 return
@@ -165,8 +359,13 @@ class RPCProducer:
                 logger.warning(f"No pending request for correlation_id: {correlation_id}")
                 return
             
+            # Вызов мог уже завершиться по таймауту или ошибке публикации
+            if future.done():
+                logger.warning(f"Late response for completed request: {correlation_id}")
+                return
+            
             # Парсим ответ
-            response_body = json.loads(message.body.decode())
+            response_body = orjson.loads(message.body)
             
             # Проверяем на ошибку JSON-RPC
             if "error" in response_body:
@@ -183,13 +382,70 @@ class RPCProducer:
         except Exception as e:
             logger.error(f"Error processing response: {e}", exc_info=True)
             # Если есть correlation_id, устанавливаем ошибку в Future
-            if correlation_id and correlation_id in self._futures:
-                self._futures[correlation_id].set_exception(e)
+            future = self._futures.get(correlation_id) if correlation_id else None
+            if future is not None and not future.done():
+                future.set_exception(e)
     
     async def close(self):
         """
-        Закрывает продюсер и отписывается от очереди ответов.
+        Закрывает продюсер: отписывается от очереди ответов и закрывает свои каналы.
         """
         if self._callback_queue and self._consumer_tag:
             await self._callback_queue.cancel(self._consumer_tag)
             logger.info("RPCProducer closed")
+        
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        
+        # Вызовы, запросы которых не отправлены или ответ на которые еще не пришел,
+        # завершаются сразу, а не по таймауту RPC
+        self._fail_pending_calls(ConnectionError("producer closed"))
+        self._outgoing = None
+        
+        if self._channel_pool is not None:
+            await self._channel_pool.close()
+            self._channel_pool = None
+        
+        # Канал закрывается вместе с consumer'ом очереди ответов; ошибка закрытия
+        # (например, соединение уже разорвано) не мешает остановке продюсера
+        if self._channel is not None:
+            try:
+                await self._channel.close()
+            except Exception as e:
+                logger.warning(f"Failed to close RPCProducer channel: {e}")
+        
+        # Следующий call() заново инициализирует канал и очередь ответов
+        self._channel = None
+
+
+async def get_producer() -> RPCProducer:
+    """
+    Возвращает общий продюсер процесса, подключая его при первом обращении.
+    Соединение, канал и очередь ответов создаются один раз, а не на каждый запрос.
+    
+    :return: Подключенный продюсер
+    """
+    global _producer
+    if _producer is not None:
+        return _producer
+    
+    async with _producer_lock:
+        # Повторная проверка: продюсер мог быть создан, пока мы ждали блокировку
+        if _producer is None:
+            producer = RPCProducer()
+            await producer.connect()
+            _producer = producer
+    
+    return _producer
+
+
+async def close_producer() -> None:
+    """
+    Закрывает общий продюсер и его соединение. Вызывается при остановке приложения.
+    """
+    global _producer
+    if _producer is not None:
+        producer, _producer = _producer, None
+        await producer.close()
+        await producer.connection_manager.close()
@@ -9,6 +9,37 @@ from src.config.app_config import settings
 
 logger = logging.getLogger(__name__)
 
+# URL для проверки Yandex SmartCaptcha
+CAPTCHA_VALIDATE_URL = "https://smartcaptcha.yandexcloud.net/validate"
+
+# Общий HTTP клиент: соединение с API капчи переиспользуется между проверками
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """
+    Возвращает общий HTTP клиент, создавая его при первом обращении.
+    
+    :return: Асинхронный HTTP клиент
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+    return _client
+
+
+async def close_captcha_client() -> None:
+    """
+    Закрывает общий HTTP клиент. Вызывается при остановке приложения.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
 
 async def verify_captcha(token: str, user_ip: Optional[str] = None) -> bool:
     """
@@ -34,9 +65,6 @@ async def verify_captcha(token: str, user_ip: Optional[str] = None) -> bool:
         return False
     
     try:
-        # URL для проверки Yandex SmartCaptcha
-        url = "https://smartcaptcha.yandexcloud.net/validate"
-        
         # Параметры запроса
         params = {
             "secret": settings.CAPTCHA_SERVER_KEY,
@@ -47,27 +75,26 @@ async def verify_captcha(token: str, user_ip: Optional[str] = None) -> bool:
         if user_ip:
             params["ip"] = user_ip
         
-        # Отправляем GET запрос к API Yandex
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url, params=params)
-            
-            if response.status_code != 200:
-                logger.error(f"Captcha API returned status {response.status_code}: {response.text}")
-                return False
-            
-            result = response.json()
-            
-            # Проверяем результат
-            # Документация: https://yandex.cloud/ru/docs/smartcaptcha/api-ref/
-            status = result.get("status")
-            
-            if status == "ok":
-                logger.info("Captcha verification successful")
-                return True
-            else:
-                logger.warning(f"Captcha verification failed: {result}")
-                return False
-                
+        # Отправляем GET запрос к API Yandex через общий клиент
+        response = await _get_client().get(CAPTCHA_VALIDATE_URL, params=params)
+        
+        if response.status_code != 200:
+            logger.error(f"Captcha API returned status {response.status_code}: {response.text}")
+            return False
+        
+        result = response.json()
+        
+        # Проверяем результат
+        # Документация: https://yandex.cloud/ru/docs/smartcaptcha/api-ref/
+        status = result.get("status")
+        
+        if status == "ok":
+            logger.info("Captcha verification successful")
+            return True
+        else:
+            logger.warning(f"Captcha verification failed: {result}")
+            return False
+    
     except httpx.TimeoutException:
         logger.error("Captcha verification timeout")
         # В случае таймаута можем либо пропустить, либо заблокировать
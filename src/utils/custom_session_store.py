@@ -5,8 +5,9 @@
 """
 
 import time
+import heapq
 import logging
-from typing import Callable, Optional
+from typing import Callable, List, Optional, Tuple
 from fastsession import MemoryStore
 
 logger = logging.getLogger(__name__)
@@ -39,12 +40,35 @@ class CustomSessionStore(MemoryStore):
         super().__init__()
         self.on_session_delete = on_session_delete
         self.session_lifetime_hours = session_lifetime_hours
+        # Время жизни в секундах вычисляется один раз, а не при каждой очистке
+        self._lifetime_s = int(session_lifetime_hours * 3600)
+        # Куча (момент истечения, session_id): сессия с ближайшим истечением всегда наверху
+        self._expiry_heap: List[Tuple[int, str]] = []
         self.gc_threshold = gc_threshold
         logger.info(
             f"CustomSessionStore initialized: "
             f"session_lifetime={session_lifetime_hours}h, gc_threshold={gc_threshold}"
         )
     
+    def create_store(self, session_id: str) -> dict:
+        """
+        Переопределенный метод создания хранилища сессии.
+        
+        Помимо создания записи добавляет момент истечения сессии в кучу,
+        по которой cleanup_old_sessions находит истекшие сессии.
+        
+        :param session_id: Уникальный идентификатор сессии
+        :return: Хранилище данных сессии
+        """
+        store = super().create_store(session_id)
+        session_info = self.raw_memory_store.get(session_id)
+        if session_info is not None:
+            heapq.heappush(
+                self._expiry_heap,
+                (session_info["created_at"] + self._lifetime_s, session_id)
+            )
+        return store
+    
     def gc(self):
         """
         Переопределенный метод сборки мусора.
@@ -61,15 +85,26 @@ class CustomSessionStore(MemoryStore):
         Находит все сессии старше заданного времени и удаляет их.
         Перед удалением каждой сессии вызывается callback (если установлен),
         что позволяет выполнить дополнительную очистку ресурсов.
+        
+        Истекшие сессии берутся с вершины кучи _expiry_heap, поэтому просмотр
+        останавливается на первой еще не истекшей сессии и не зависит от порядка
+        записей в raw_memory_store.
         """
-        current_time = int(time.time())
+        now = int(time.time())
+        # Сессии, созданные раньше этого момента, считаются истекшими
+        cutoff = now - self._lifetime_s
         sessions_to_delete = []
+        seen = set()
         
         # Находим сессии старше заданного времени жизни
-        session_lifetime_seconds = self.session_lifetime_hours * 3600
-        for session_id, session_info in self.raw_memory_store.items():
-            if current_time - session_info["created_at"] > session_lifetime_seconds:
-                sessions_to_delete.append(session_id)
+        while self._expiry_heap and self._expiry_heap[0][0] < now:
+            _, session_id = heapq.heappop(self._expiry_heap)
+            session_info = self.raw_memory_store.get(session_id)
+            # Запись уже удалена или сессия пересоздана (для нее в куче есть более поздняя запись)
+            if session_info is None or session_info["created_at"] >= cutoff or session_id in seen:
+                continue
+            seen.add(session_id)
+            sessions_to_delete.append(session_id)
         
         if sessions_to_delete:
             logger.info(f"Cleaning up {len(sessions_to_delete)} old sessions")
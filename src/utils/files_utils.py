@@ -1,10 +1,22 @@
 import os
 import time
 import logging
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# Максимальное число потоков для параллельного удаления файлов
+_CLEANUP_MAX_WORKERS = 8
+
+# Соответствие MIME типов поддерживаемых видео расширениям файлов
+_MIME_TO_EXT: dict[str, str] = {
+    "video/x-matroska": "mkv",
+    "video/mp4": "mp4",
+    "video/webm": "webm",
+    "video/quicktime": "mov",
+}
+
 
 def get_file_extension_by_name(filename: str) -> str:
     """
@@ -13,26 +25,19 @@ def get_file_extension_by_name(filename: str) -> str:
     :param filename: Имя файла.
     :return: Расширение файла (без точки), или пустая строка, если расширение отсутствует.
     """
-    parts = filename.rsplit('.', 1)
-    if len(parts) == 2:
-        return parts[1].lower()
-    return ''
+    _, sep, ext = filename.rpartition('.')
+    return ext.lower() if sep else ''
 
 
-def get_file_extension_by_content_type(content_type: str) -> str:
+def get_file_extension_by_content_type(content_type: Optional[str]) -> str:
     """
     Возвращает расширение файла по его MIME типу.
+    Поиск - одно обращение к словарю _MIME_TO_EXT, поэтому отдельный кэш не нужен.
     
-    :param content_type: MIME тип файла.
+    :param content_type: MIME тип файла (None, если тип не передан).
     :return: Расширение файла (без точки), или пустая строка, если тип неизвестен.
     """
-    mime_to_extension = {
-        "video/x-matroska": "mkv",
-        "video/mp4": "mp4",
-        "video/webm": "webm",
-        "video/quicktime": "mov",
-    }
-    return mime_to_extension.get(content_type, '')
+    return _MIME_TO_EXT.get(content_type, '')
 
 
 def cleanup_session_file(session_id: str, session_data: dict) -> None:
@@ -74,10 +79,26 @@ def cleanup_session_file(session_id: str, session_data: dict) -> None:
         logger.error(f"Failed to delete file {file_path}: {e}", exc_info=True)
 
 
-def cleanup_orphaned_files(temp_dir: str, max_age_hours: int = 24) -> int:
+def _remove_orphaned_file(file_path: str) -> bool:
+    """
+    Удаляет один "осиротевший" файл.
+    
+    :param file_path: Путь к файлу
+    :return: True, если файл удален
+    """
+    try:
+        os.remove(file_path)
+        logger.debug(f"Removed orphaned file: {file_path}")
+        return True
+    except OSError as e:
+        logger.warning(f"Failed to remove orphaned file {file_path}: {e}")
+        return False
+
+
+def cleanup_orphaned_files(temp_dir: str, max_age_hours: float = 24) -> int:
     """
     Удаляет файлы старше max_age_hours из TEMP_DIR.
-    Вызывается при старте приложения для очистки "осиротевших" файлов.
+    Вызывается при старте приложения и периодически воркером для очистки "осиротевших" файлов.
     
     :param temp_dir: Путь к директории с временными файлами
     :param max_age_hours: Максимальный возраст файлов в часах
@@ -92,23 +113,32 @@ def cleanup_orphaned_files(temp_dir: str, max_age_hours: int = 24) -> int:
     deleted_count = 0
     
     try:
-        for file_path in Path(temp_dir).iterdir():
-            if file_path.is_file():
+        # scandir отдает тип записи вместе с листингом каталога, поэтому
+        # на каждый файл остается один stat() вместо трех
+        expired_files = []
+        with os.scandir(temp_dir) as entries:
+            for entry in entries:
                 try:
-                    file_mtime = file_path.stat().st_mtime
-                    if file_mtime < cutoff_time:
-                        os.remove(file_path)
-                        deleted_count += 1
-                        logger.debug(f"Removed orphaned file: {file_path}")
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    if entry.stat(follow_symlinks=False).st_mtime < cutoff_time:
+                        expired_files.append(entry.path)
                 except OSError as e:
-                    logger.warning(f"Failed to remove orphaned file {file_path}: {e}")
+                    logger.warning(f"Failed to check orphaned file {entry.path}: {e}")
                     continue
+        
+        # Системные вызовы unlink отпускают GIL, поэтому удаление в пуле потоков
+        # идет параллельно
+        if expired_files:
+            workers = min(_CLEANUP_MAX_WORKERS, len(expired_files))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                deleted_count = sum(executor.map(_remove_orphaned_file, expired_files))
     except Exception as e:
         logger.error(f"Error during orphaned files cleanup: {e}", exc_info=True)
     
     if deleted_count > 0:
-        logger.info(f"Startup cleanup: removed {deleted_count} orphaned files from {temp_dir}")
+        logger.info(f"Orphaned files cleanup: removed {deleted_count} files from {temp_dir}")
     else:
-        logger.info(f"Startup cleanup: no orphaned files found in {temp_dir}")
+        logger.info(f"Orphaned files cleanup: no orphaned files found in {temp_dir}")
     
     return deleted_count
\ No newline at end of file
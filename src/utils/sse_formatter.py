@@ -4,12 +4,86 @@
 Поддерживает автоматическое определение типа события по структуре сообщения.
 """
 
-import json
+import asyncio
+import contextlib
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional, AsyncIterator, Callable
+
+import orjson
+
+from src.services.base_service import BaseService
 
 logger = logging.getLogger(__name__)
 
+# Готовые префиксы SSE событий для известных типов
+_EVENT_PREFIXES: Dict[str, bytes] = {
+    "progress": b"event: progress\ndata: ",
+    "complete": b"event: complete\ndata: ",
+    "error": b"event: error\ndata: ",
+}
+
+# SSE комментарий для поддержания соединения
+_KEEPALIVE = ": keepalive\n\n"
+
+# Завершающие события потока: после них пакет отправляется сразу
+_TERMINAL_EVENT_PREFIXES = (_EVENT_PREFIXES["complete"], _EVENT_PREFIXES["error"])
+
+# Максимальный размер пакета при объединении SSE событий
+SSE_COALESCE_MAX_BATCH = 64
+# Сколько секунд ждать закрытия исходного генератора при закрытии обертки
+SSE_COALESCE_CLOSE_TIMEOUT = 5.0
+
+# Порядок ключей сообщения create_progress_message, для которого работает быстрый кодировщик
+_PROGRESS_KEYS = ("progress", "stage", "status")
+_PROGRESS_KEYS_WITH_TIMESTAMP = ("progress", "stage", "status", "timestamp")
+
+
+def _is_plain_ascii(value: str) -> bool:
+    """
+    Проверяет, что строку можно записать в JSON без экранирования.
+    
+    :param value: Проверяемая строка
+    :return: True для печатных ASCII строк без кавычек и обратных слэшей
+    """
+    return value.isascii() and value.isprintable() and '"' not in value and '\\' not in value
+
+
+def _fast_encode_progress(message: Dict[str, Any]) -> Optional[bytes]:
+    """
+    Кодирует типичное сообщение о прогрессе без JSON библиотеки.
+    
+    Поддерживается форма create_progress_message без details:
+    {"progress": int, "stage": str, "status": str[, "timestamp": str]}
+    с ASCII строками, не требующими экранирования. Ключи должны идти
+    в этом же порядке, чтобы результат совпадал с orjson.dumps байт в байт.
+    
+    :param message: Сообщение от BaseService
+    :return: JSON в виде байтов или None, если сообщение не подходит под шаблон
+    """
+    keys = tuple(message)
+    if keys != _PROGRESS_KEYS and keys != _PROGRESS_KEYS_WITH_TIMESTAMP:
+        return None
+    
+    progress = message["progress"]
+    stage = message["stage"]
+    status = message["status"]
+    if type(progress) is not int or type(stage) is not str or type(status) is not str:
+        return None
+    if not (_is_plain_ascii(stage) and _is_plain_ascii(status)):
+        return None
+    
+    if len(keys) == 3:
+        return b'{"progress":%d,"stage":"%s","status":"%s"}' % (
+            progress, stage.encode(), status.encode()
+        )
+    
+    timestamp = message["timestamp"]
+    if type(timestamp) is not str or not _is_plain_ascii(timestamp):
+        return None
+    return b'{"progress":%d,"stage":"%s","status":"%s","timestamp":"%s"}' % (
+        progress, stage.encode(), status.encode(), timestamp.encode()
+    )
+
 
 class SSEEventFormatter:
     """
@@ -29,23 +103,35 @@ class SSEEventFormatter:
         :param message: Сообщение от BaseService (create_progress_message, etc.)
         :return: Отформатированная SSE строка с двойным \n\n
         """
-        event_type = SSEEventFormatter._detect_event_type(message)
+        return SSEEventFormatter.format_event_bytes(message).decode()
+    
+    @staticmethod
+    def format_event_bytes(message: Dict[str, Any]) -> bytes:
+        """
+        Преобразует dict-сообщение в SSE событие в виде UTF-8 байтов.
+        StreamingResponse отправляет байты как есть, без повторного кодирования.
         
-        # Формируем SSE событие
-        sse_lines = []
+        :param message: Сообщение от BaseService (create_progress_message, etc.)
+        :return: SSE событие с двойным \n\n
+        """
+        event_type = SSEEventFormatter._detect_event_type(message)
         
-        # Тип события
-        if event_type:
-            sse_lines.append(f"event: {event_type}")
+        # Префикс "event: ...\ndata: " берется готовым: _detect_event_type возвращает
+        # только типы из _EVENT_PREFIXES
+        prefix = _EVENT_PREFIXES[event_type]
         
-        # Данные события
-        data_json = json.dumps(message, ensure_ascii=False)
-        sse_lines.append(f"data: {data_json}")
+        # Данные события: типичный прогресс кодируется по шаблону, остальное - через orjson
+        # (orjson пишет UTF-8 без экранирования, как ensure_ascii=False)
+        data = _fast_encode_progress(message)
+        if data is None:
+            data = orjson.dumps(message)
         
-        # SSE требует двойной перевод строки в конце
-        sse_event = "\n".join(sse_lines) + "\n\n"
+        # SSE требует двойной перевод строки в конце. join собирает событие одной
+        # аллокацией, без промежуточного объекта prefix + data
+        sse_event = b"".join((prefix, data, b"\n\n"))
         
-        logger.debug(f"Formatted SSE event (type={event_type}): {sse_event[:200]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Formatted SSE event (type=%s): %r", event_type, sse_event[:200])
         
         return sse_event
     
@@ -57,16 +143,18 @@ class SSEEventFormatter:
         :param message: Сообщение от BaseService
         :return: Тип события ("progress", "complete", "error")
         """
+        # Поля progress и stage нужны только для статуса success,
+        # поэтому для обычного прогресса выполняется одно обращение к словарю
         status = message.get("status", "processing")
-        progress = message.get("progress", 0)
-        stage = message.get("stage", "")
         
-        # Ошибка - всегда приоритет
+        # Ошибка - всегда приоритет (в том числе поле error при любом статусе)
         if status == "error" or "error" in message:
             return "error"
         
         # Успешное завершение
-        if status == "success" and (progress == 100 or stage == "complete"):
+        if status == "success" and (
+            message.get("progress", 0) == 100 or message.get("stage", "") == "complete"
+        ):
             return "complete"
         
         # Промежуточный прогресс (по умолчанию)
@@ -80,7 +168,7 @@ class SSEEventFormatter:
         
         :return: SSE комментарий
         """
-        return ": keepalive\n\n"
+        return _KEEPALIVE
     
     @staticmethod
     def format_custom_event(event_type: str, data: Dict[str, Any]) -> str:
@@ -91,5 +179,120 @@ class SSEEventFormatter:
         :param data: Данные события
         :return: Отформатированная SSE строка
         """
-        data_json = json.dumps(data, ensure_ascii=False)
+        data_json = orjson.dumps(data).decode()
         return f"event: {event_type}\ndata: {data_json}\n\n"
+
+
+async def stream_service_events(
+    service: BaseService,
+    params: Dict[str, Any],
+    service_name: str,
+    format_event: Callable[[Dict[str, Any]], bytes] = SSEEventFormatter.format_event_bytes
+) -> AsyncIterator[bytes]:
+    """
+    Выполняет execute_stream сервиса и преобразует его сообщения в SSE события.
+    Ошибка выполнения превращается в финальное событие error.
+    
+    :param service: Экземпляр сервиса (наследник BaseService)
+    :param params: Параметры для execute_stream(data)
+    :param service_name: Имя сервиса для логов и текста ошибки
+    :param format_event: Функция форматирования сообщения в SSE событие
+    :yields: SSE события в виде UTF-8 байтов
+    """
+    logger.info("Starting SSE stream for service: %s", service_name)
+    
+    try:
+        # message - это dict от BaseService.create_progress_message() и т.д.
+        async for message in service.execute_stream(params):
+            yield format_event(message)
+        
+        logger.info("SSE stream completed for service: %s", service_name)
+    
+    except Exception as e:
+        logger.error("Error during SSE stream for %s: %s", service_name, e, exc_info=True)
+        
+        # Формируем ошибку через BaseService для единообразия
+        error_message = service.create_error_message(
+            error_code="SERVICE_EXECUTION_ERROR",
+            error_message=f"Ошибка выполнения сервиса {service_name}",
+            stage_failed="execution",
+            error_details=str(e),
+            recoverable=True
+        )
+        
+        yield format_event(error_message)
+
+
+async def coalesce_sse_events(
+    events: AsyncIterator[bytes],
+    max_batch: int = SSE_COALESCE_MAX_BATCH
+) -> AsyncIterator[bytes]:
+    """
+    Объединяет SSE события, уже накопившиеся к моменту отправки, в один блок байтов.
+    Быстро идущие события прогресса уходят клиенту одной записью в сокет, а не отдельными
+    мелкими записями. Событие не задерживается: пакет отправляется, как только очередь
+    опустела или в нее пришло завершающее событие (complete/error).
+    
+    Исходный поток читается в отдельной задаче через очередь размером max_batch:
+    если клиент читает медленно, задача ждет свободного места, и давление StreamingResponse
+    передается исходному генератору. При закрытии обертки (например, при отключении
+    клиента) задача отменяется, исходный генератор закрывается и его finally выполняется.
+    
+    :param events: Поток готовых SSE событий в виде байтов
+    :param max_batch: Максимальное число событий в одном блоке
+    :yields: Одно или несколько SSE событий, записанных подряд
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_batch)
+    finished = object()
+    error: Optional[BaseException] = None
+    
+    async def pump():
+        nonlocal error
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            error = e
+        finally:
+            # При отмене задача может ждать в queue.put, а не внутри генератора,
+            # поэтому генератор закрывается явно
+            aclose = getattr(events, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        # Маркер конца потока; при отмене не отправляется
+        await queue.put(finished)
+    
+    pump_task = asyncio.create_task(pump())
+    
+    try:
+        done = False
+        while not done:
+            event = await queue.get()
+            if event is finished:
+                break
+            
+            # Пакет дополняется только событиями, которые уже ждут в очереди
+            batch = [event]
+            while (
+                len(batch) < max_batch
+                and not queue.empty()
+                and not event.startswith(_TERMINAL_EVENT_PREFIXES)
+            ):
+                event = queue.get_nowait()
+                if event is finished:
+                    done = True
+                    break
+                batch.append(event)
+            
+            yield batch[0] if len(batch) == 1 else b"".join(batch)
+        
+        if error is not None:
+            raise error
+    
+    finally:
+        # Дожидаемся закрытия исходного генератора, чтобы его очистка завершилась
+        # вместе с ответом. Ожидание защищено от повторной отмены (anyio отменяет
+        # задачу ответа при отключении клиента) и ограничено по времени
+        pump_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.shield(pump_task), SSE_COALESCE_CLOSE_TIMEOUT)
@@ -4,13 +4,29 @@
 Работает с любым сервисом, наследующим BaseService и реализующим execute_stream().
 """
 
+import importlib
 import logging
-from typing import AsyncIterator, Dict, Any
+from typing import AsyncIterator, Dict, Any, Type
 from src.services.base_service import BaseService
-from src.utils.sse_formatter import SSEEventFormatter
+from src.utils.sse_formatter import SSEEventFormatter, stream_service_events
 
 logger = logging.getLogger(__name__)
 
+# Классы сервисов, уже найденные execute_by_name (имя класса -> класс)
+_SERVICE_CLASS_CACHE: Dict[str, Type[BaseService]] = {}
+
+# Шаблон события "сервис не найден"; при использовании копируется и дополняется текстом
+_SERVICE_NOT_FOUND_ERROR = {
+    "progress": -1,
+    "stage": "error",
+    "status": "error",
+    "error": {
+        "code": "SERVICE_NOT_FOUND",
+        "message": "",
+        "details": ""
+    }
+}
+
 
 class SSEServiceExecutor:
     """
@@ -22,56 +38,26 @@ class SSEServiceExecutor:
             yield sse_event
     """
     
-    def __init__(self):
-        self.formatter = SSEEventFormatter()
-    
     async def execute_service_stream(
         self, 
         service: BaseService, 
         params: Dict[str, Any]
-    ) -> AsyncIterator[str]:
+    ) -> AsyncIterator[bytes]:
         """
         Выполняет сервис локально и возвращает SSE поток событий.
         
         :param service: Экземпляр сервиса (наследник BaseService)
         :param params: Параметры для execute_stream(data)
-        :yields: SSE события в формате строк
+        :yields: SSE события в виде UTF-8 байтов
         """
-        service_name = service.getName()
-        logger.info(f"Starting SSE execution of service: {service_name}")
-        
-        try:
-            # Вызываем execute_stream у сервиса
-            async for message in service.execute_stream(params):
-                # message - это dict от BaseService.create_progress_message() и т.д.
-                
-                # Преобразуем в SSE формат
-                sse_event = self.formatter.format_event(message)
-                
-                yield sse_event
-            
-            logger.info(f"SSE execution completed: {service_name}")
-            
-        except Exception as e:
-            logger.error(f"Error during SSE execution of {service_name}: {e}", exc_info=True)
-            
-            # Формируем ошибку через BaseService для единообразия
-            error_message = service.create_error_message(
-                error_code="SERVICE_EXECUTION_ERROR",
-                error_message=f"Ошибка выполнения сервиса {service_name}",
-                stage_failed="execution",
-                error_details=str(e),
-                recoverable=True
-            )
-            
-            sse_error = self.formatter.format_event(error_message)
-            yield sse_error
+        async for sse_event in stream_service_events(service, params, service.getName()):
+            yield sse_event
     
     async def execute_by_name(
         self, 
         service_name: str, 
         params: Dict[str, Any]
-    ) -> AsyncIterator[str]:
+    ) -> AsyncIterator[bytes]:
         """
         Создает экземпляр сервиса по имени и выполняет его.
         
@@ -82,10 +68,12 @@ class SSEServiceExecutor:
         """
         # Динамический импорт сервиса
         try:
-            # Пытаемся импортировать из src.services
-            module_name = f"src.services.{service_name.lower()}"
-            module = __import__(module_name, fromlist=[service_name])
-            service_class = getattr(module, service_name)
+            # Пытаемся импортировать из src.services; импорт выполняется один раз на класс
+            service_class = _SERVICE_CLASS_CACHE.get(service_name)
+            if service_class is None:
+                module = importlib.import_module(f"src.services.{service_name.lower()}")
+                service_class = getattr(module, service_name)
+                _SERVICE_CLASS_CACHE[service_name] = service_class
             
             # Создаем экземпляр
             service_instance = service_class()
@@ -97,15 +85,9 @@ class SSEServiceExecutor:
         except (ImportError, AttributeError) as e:
             logger.error(f"Failed to load service {service_name}: {e}")
             
-            error_msg = {
-                "progress": -1,
-                "stage": "error",
-                "status": "error",
-                "error": {
-                    "code": "SERVICE_NOT_FOUND",
-                    "message": f"Сервис {service_name} не найден",
-                    "details": str(e)
-                }
-            }
+            error_msg = _SERVICE_NOT_FOUND_ERROR.copy()
+            error = error_msg["error"] = _SERVICE_NOT_FOUND_ERROR["error"].copy()
+            error["message"] = f"Сервис {service_name} не найден"
+            error["details"] = str(e)
             
-            yield self.formatter.format_event(error_msg)
+            yield SSEEventFormatter.format_event_bytes(error_msg)
@@ -6,19 +6,34 @@ Singleton реестр для прямого доступа к сервисам
 """
 
 import logging
+import threading
 from typing import Dict, Optional, AsyncIterator
 from src.services.base_service import BaseService
 from src.transport.json_rpc.service_loader import ServiceLoader
-from src.utils.sse_formatter import SSEEventFormatter
+from src.utils.sse_formatter import SSEEventFormatter, stream_service_events
 
 logger = logging.getLogger(__name__)
 
+# Шаблон события "сервис не найден"; при использовании копируется и дополняется текстом
+_SERVICE_NOT_FOUND_ERROR = {
+    "progress": -1,
+    "stage": "error",
+    "status": "error",
+    "error": {
+        "code": "SERVICE_NOT_FOUND",
+        "message": "",
+        "stage_failed": "initialization",
+        "recoverable": False
+    }
+}
+
 
 class SSEServiceRegistry:
     """
     Singleton реестр для прямого доступа к сервисам.
     
-    Автоматически обнаруживает все сервисы при инициализации.
+    Обнаруживает сервисы лениво, при первом обращении к реестру,
+    поэтому импорт модуля не загружает сервисы.
     Предоставляет унифицированный интерфейс для SSE streaming.
     """
     
@@ -34,11 +49,25 @@ class SSEServiceRegistry:
         # Инициализируем только один раз
         if not SSEServiceRegistry._initialized:
             self.services: Dict[str, BaseService] = {}
-            self.formatter = SSEEventFormatter()
-            self._discover_services()
+            self._services_loaded = False
+            self._load_lock = threading.Lock()
             SSEServiceRegistry._initialized = True
             logger.info("SSEServiceRegistry initialized")
     
+    def _ensure_services_loaded(self):
+        """
+        Загружает сервисы при первом обращении.
+        После загрузки проверка сводится к чтению одного флага; блокировка
+        нужна только на первый раз, чтобы сервисы не обнаруживались дважды.
+        """
+        if self._services_loaded:
+            return
+        
+        with self._load_lock:
+            if not self._services_loaded:
+                self._discover_services()
+                self._services_loaded = True
+    
     def _discover_services(self):
         """Обнаруживает и регистрирует все доступные сервисы."""
         loader = ServiceLoader()
@@ -61,6 +90,7 @@ class SSEServiceRegistry:
         :param service_name: Имя сервиса (например "ml", "test")
         :return: Экземпляр сервиса или None
         """
+        self._ensure_services_loaded()
         return self.services.get(service_name)
     
     def list_services(self) -> list[str]:
@@ -69,60 +99,33 @@ class SSEServiceRegistry:
         
         :return: Список имён сервисов
         """
+        self._ensure_services_loaded()
         return list(self.services.keys())
     
     async def execute_service_stream(
         self, 
         service_name: str, 
         params: dict
-    ) -> AsyncIterator[str]:
+    ) -> AsyncIterator[bytes]:
         """
         Выполнить сервис с SSE streaming.
         
         :param service_name: Имя сервиса (например "ml", "test")
         :param params: Параметры для execute_stream(data)
-        :yields: SSE события в формате строк
+        :yields: SSE события в виде UTF-8 байтов
         """
         service = self.get_service(service_name)
+        format_event = SSEEventFormatter.format_event_bytes
         
         if not service:
-            error_msg = {
-                "progress": -1,
-                "stage": "error",
-                "status": "error",
-                "error": {
-                    "code": "SERVICE_NOT_FOUND",
-                    "message": f"Сервис '{service_name}' не найден",
-                    "stage_failed": "initialization",
-                    "recoverable": False
-                }
-            }
-            yield self.formatter.format_event(error_msg)
+            error_msg = _SERVICE_NOT_FOUND_ERROR.copy()
+            error_msg["error"] = _SERVICE_NOT_FOUND_ERROR["error"].copy()
+            error_msg["error"]["message"] = f"Сервис '{service_name}' не найден"
+            yield format_event(error_msg)
             return
         
-        logger.info(f"Starting SSE stream for service: {service_name}")
-        
-        try:
-            # Вызываем execute_stream у сервиса
-            async for message in service.execute_stream(params):
-                # message - это dict от BaseService.create_progress_message() и т.д.
-                sse_event = self.formatter.format_event(message)
-                yield sse_event
-            
-            logger.info(f"SSE stream completed for service: {service_name}")
-            
-        except Exception as e:
-            logger.error(f"Error during SSE stream for {service_name}: {e}", exc_info=True)
-            
-            error_message = service.create_error_message(
-                error_code="SERVICE_EXECUTION_ERROR",
-                error_message=f"Ошибка выполнения сервиса {service_name}",
-                stage_failed="execution",
-                error_details=str(e),
-                recoverable=True
-            )
-            
-            yield self.formatter.format_event(error_message)
+        async for sse_event in stream_service_events(service, params, service_name):
+            yield sse_event
 
 
 # Глобальный экземпляр для удобства импорта
@@ -5,14 +5,59 @@
 в соответствии со спецификацией W3C EventSource API.
 """
 
-import json
+import time
 import asyncio
-from typing import Dict, Any, Union, AsyncIterator, Optional, Literal
+from types import MappingProxyType
+from typing import Dict, Any, Union, AsyncIterator, Optional, Literal, Mapping
 from datetime import datetime
 
+import orjson
+
+from src.config.app_config import settings
 from src.schemas.sse_schemas import SSEMessage, SSEProgressMessage, SSESuccessMessage, SSEErrorMessage
 
 
+# Стандартные заголовки SSE ответов
+_SSE_HEADERS: Mapping[str, str] = MappingProxyType({
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # Отключает буферизацию nginx
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Cache-Control"
+})
+
+# Обязательные поля и допустимые статусы SSE сообщения
+_REQUIRED_FIELDS = frozenset(('progress', 'stage', 'status'))
+_VALID_STATUSES = frozenset(('processing', 'success', 'error'))
+
+# Keep-alive событие без ID с комментарием по умолчанию
+_DEFAULT_KEEP_ALIVE = "event: keep-alive\n: keep-alive\n"
+
+
+def _timestamp_ms() -> int:
+    """
+    Возвращает текущее время в миллисекундах Unix epoch для поля timestamp.
+    
+    :return: Время в миллисекундах
+    """
+    return time.time_ns() // 1_000_000
+
+
+def _json_default(obj: Any) -> Any:
+    """
+    Сериализует типы, которые orjson не поддерживает напрямую.
+    Pydantic модели преобразуются в словарь, остальное - в строку.
+    
+    :param obj: Объект для сериализации
+    :return: Значение, которое orjson может записать
+    """
+    model_dump = getattr(obj, 'model_dump', None)
+    if callable(model_dump):
+        return model_dump()
+    return str(obj)
+
+
 def format_sse_event(
     data: Union[Dict[str, Any], SSEMessage],
     event_type: Optional[str] = None,
@@ -28,42 +73,37 @@ def format_sse_event(
     :param retry: Время повторного подключения в миллисекундах
     :return: Отформатированная SSE строка
     """
-    lines = []
+    # Конвертируем данные в JSON одним проходом orjson; Pydantic модели
+    # и прочие несериализуемые объекты обрабатывает _json_default. Нестроковые ключи
+    # допускаются, как и в json.dumps
+    json_data = orjson.dumps(data, default=_json_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    parts = []
     
     # Добавляем тип события
     if event_type:
-        lines.append(f"event: {event_type}")
+        parts.append(f"event: {event_type}\n")
     
     # Добавляем ID события
     if event_id:
-        lines.append(f"id: {event_id}")
+        parts.append(f"id: {event_id}\n")
     
     # Добавляем retry время
     if retry is not None:
-        lines.append(f"retry: {retry}")
+        parts.append(f"retry: {retry}\n")
     
-    # Конвертируем данные в JSON  
-    try:
-        if hasattr(data, 'model_dump') and callable(getattr(data, 'model_dump')):
-            # Pydantic модель
-            json_data = json.dumps(data.model_dump(), ensure_ascii=False, default=str)  # type: ignore
-        else:
-            # Обычный словарь
-            json_data = json.dumps(data, ensure_ascii=False, default=str)
-    except (TypeError, AttributeError):
-        # Fallback на обычное преобразование
-        json_data = json.dumps(data, ensure_ascii=False, default=str)
-    
-    # Добавляем данные (могут быть многострочными)
-    for line in json_data.split('\n'):
-        lines.append(f"data: {line}")
-    
-    # Добавляем пустую строку в конце (обязательно для SSE)
-    # Важно: SSE сообщения разделяются двойным \n\n
-    lines.append("")
-    lines.append("")  # Вторая пустая строка для двойного \n\n
+    # Добавляем данные. Однострочный JSON (обычный случай: orjson без OPT_INDENT_2
+    # не пишет сырых переводов строк) выводится одной строкой data
+    if '\n' not in json_data:
+        parts.append(f"data: {json_data}\n")
+    else:
+        for line in json_data.split('\n'):
+            parts.append(f"data: {line}\n")
     
-    return '\n'.join(lines)
+    # SSE сообщения разделяются двойным \n\n
+    parts.append("\n")
+    
+    return ''.join(parts)
 
 
 def format_sse_progress(
@@ -81,19 +121,17 @@ def format_sse_progress(
     :param details: Дополнительная информация
     :return: Отформатированная SSE строка
     """
-    from src.schemas.sse_schemas import SSEMessageDetails
-    
-    # Конвертируем details в Pydantic модель если нужно
-    details_obj = None
-    if details:
-        details_obj = SSEMessageDetails(**details)
-    
-    message = SSEProgressMessage(
-        progress=progress,
-        stage=stage,
-        timestamp=datetime.now(),
-        details=details_obj
-    )
+    message = {
+        "progress": progress,
+        "stage": stage,
+        "status": "processing",
+        "timestamp": _timestamp_ms(),
+        "details": details or None
+    }
+    
+    # Сообщения собираются как обычные словари; схема проверяется только в режиме отладки
+    if settings.DEBUG:
+        SSEProgressMessage.model_validate(message)
     
     return format_sse_event(
         data=message,
@@ -113,10 +151,16 @@ def format_sse_success(
     :param event_id: ID события
     :return: Отформатированная SSE строка
     """
-    message = SSESuccessMessage(
-        timestamp=datetime.now(),
-        result=result
-    )
+    message = {
+        "progress": 100,
+        "stage": "complete",
+        "status": "success",
+        "timestamp": _timestamp_ms(),
+        "result": result
+    }
+    
+    if settings.DEBUG:
+        SSESuccessMessage.model_validate(message)
     
     return format_sse_event(
         data=message,
@@ -144,20 +188,22 @@ def format_sse_error(
     :param event_id: ID события
     :return: Отформатированная SSE строка
     """
-    from src.schemas.sse_schemas import SSEErrorInfo
-    
-    error_info = SSEErrorInfo(
-        code=error_code,
-        message=error_message,
-        stage_failed=stage_failed,
-        details=error_details,
-        recoverable=recoverable
-    )
+    message = {
+        "progress": -1,
+        "stage": "error",
+        "status": "error",
+        "timestamp": _timestamp_ms(),
+        "error": {
+            "code": error_code,
+            "message": error_message,
+            "stage_failed": stage_failed,
+            "details": error_details,
+            "recoverable": recoverable
+        }
+    }
     
-    message = SSEErrorMessage(
-        timestamp=datetime.now(),
-        error=error_info
-    )
+    if settings.DEBUG:
+        SSEErrorMessage.model_validate(message)
     
     return format_sse_event(
         data=message,
@@ -177,6 +223,10 @@ def format_sse_keep_alive(
     :param event_id: ID события
     :return: Отформатированная SSE строка
     """
+    # Вызов с параметрами по умолчанию всегда дает одну и ту же строку
+    if event_id is None and comment == "keep-alive":
+        return _DEFAULT_KEEP_ALIVE
+    
     lines = []
     
     # Keep-alive событие
@@ -208,7 +258,6 @@ async def sse_event_generator(
     :yields: Отформатированные SSE строки
     """
     event_counter = 0
-    last_activity = asyncio.get_event_loop().time()
     
     async def send_keep_alive():
         nonlocal event_counter
@@ -216,14 +265,28 @@ async def sse_event_generator(
         event_id = f"{event_id_prefix}-ka-{event_counter}" if event_id_prefix else None
         return format_sse_keep_alive(event_id=event_id)
     
+    iterator = messages.__aiter__()
+    # Ожидание следующего сообщения живет в отдельной задаче: по таймауту keep-alive
+    # она не отменяется (в отличие от wait_for), и исходный генератор не прерывается
+    next_message: Optional[asyncio.Future] = None
+    
     try:
-        async for message in messages:
-            current_time = asyncio.get_event_loop().time()
+        while True:
+            if next_message is None:
+                next_message = asyncio.ensure_future(iterator.__anext__())
             
-            # Отправляем keep-alive если прошло много времени
-            if current_time - last_activity > keep_alive_interval:
+            # Keep-alive отправляется, только если за интервал не пришло ни одного сообщения
+            done, _ = await asyncio.wait((next_message,), timeout=keep_alive_interval)
+            if not done:
                 yield await send_keep_alive()
-                last_activity = current_time
+                continue
+            
+            try:
+                message = next_message.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                next_message = None
             
             event_counter += 1
             event_id = f"{event_id_prefix}-{event_counter}" if event_id_prefix else str(event_counter)
@@ -244,11 +307,6 @@ async def sse_event_generator(
                 event_type=event_type,
                 event_id=event_id
             )
-            
-            last_activity = current_time
-            
-            # Небольшая пауза для контроля потока
-            await asyncio.sleep(0.01)
     
     except Exception as e:
         # В случае ошибки генератора отправляем ошибку
@@ -262,22 +320,22 @@ async def sse_event_generator(
             error_details=str(e),
             event_id=event_id
         )
+    
+    finally:
+        # Клиент отключился или поток прерван: не оставляем висящее ожидание сообщения
+        if next_message is not None:
+            next_message.cancel()
 
 
-def get_sse_headers() -> Dict[str, str]:
+def get_sse_headers() -> Mapping[str, str]:
     """
     Возвращает стандартные заголовки для SSE ответов.
+    Заголовки общие для всех запросов, поэтому возвращается неизменяемое представление
+    модульной константы: Starlette копирует их в ответ сам.
     
-    :return: Словарь с заголовками
+    :return: Неизменяемый словарь с заголовками
     """
-    return {
-        "Content-Type": "text/event-stream",
-        "Cache-Control": "no-cache",
-        "Connection": "keep-alive",
-        "X-Accel-Buffering": "no",  # Отключает буферизацию nginx
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Headers": "Cache-Control"
-    }
+    return _SSE_HEADERS
 
 
 def validate_sse_message(data: Dict[str, Any]) -> bool:
@@ -288,19 +346,18 @@ def validate_sse_message(data: Dict[str, Any]) -> bool:
     :return: True если сообщение валидно
     """
     try:
-        # Проверяем наличие обязательных полей
-        required_fields = ['progress', 'stage', 'status']
-        for field in required_fields:
-            if field not in data:
-                return False
-        
-        # Проверяем типы и значения
-        progress = data['progress']
-        if not isinstance(progress, int) or (progress < -1 or progress > 100):
+        # Проверяем наличие обязательных полей одной операцией над множеством ключей
+        if not _REQUIRED_FIELDS <= data.keys():
             return False
         
+        # Проверяем статус первым: это самая дешевая проверка
         status = data['status']
-        if status not in ['processing', 'success', 'error']:
+        if status not in _VALID_STATUSES:
+            return False
+        
+        # Проверяем тип и значение прогресса (bool не считается числом прогресса)
+        progress = data['progress']
+        if type(progress) is not int or progress < -1 or progress > 100:
             return False
         
         # Специфические проверки по статусу
@@ -312,7 +369,7 @@ def validate_sse_message(data: Dict[str, Any]) -> bool:
         
         return True
     
-    except (KeyError, TypeError, ValueError):
+    except (KeyError, TypeError, ValueError, AttributeError):
         return False
 
 
@@ -1,9 +1,27 @@
-import re
+from functools import lru_cache
 
+_UPPER = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+_LOWER = frozenset('abcdefghijklmnopqrstuvwxyz')
+_LOWER_OR_DIGIT = _LOWER | frozenset('0123456789')
+
+
+@lru_cache(maxsize=256)
 def to_snake_case(name: str) -> str:
     """
     Преобразует строку из CamelCase в snake_case.
     Например, 'SomeTestService' -> 'some_test_service'.
+
+    Строка проходится за один раз: '_' ставится перед заглавной буквой, если перед ней
+    строчная буква или цифра, либо если за ней следует строчная буква (начало слова
+    после аббревиатуры, 'HTTPServer' -> 'http_server').
+    Набор имен сервисов небольшой и фиксированный, поэтому результат кешируется.
     """
-    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
-    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+    out = []
+    last = len(name) - 1
+    for i, c in enumerate(name):
+        if c in _UPPER and i and (
+            name[i - 1] in _LOWER_OR_DIGIT or (i < last and name[i + 1] in _LOWER)
+        ):
+            out.append('_')
+        out.append(c)
+    return ''.join(out).lower()
@@ -1,93 +1,151 @@
 import os
-import uuid
+import time
+import secrets
 import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional
-import aiofiles
+from typing import Dict, Any, Optional, BinaryIO, Union
 
 from src.config.app_config import settings
 from src.utils.files_utils import get_file_extension_by_content_type
 
 logger = logging.getLogger(__name__)
 
+__all__ = [
+    'UPLOAD_CHUNK_SIZE',
+    'iso_from_epoch',
+    'FileUploadService',
+]
+
+# Размер блока при копировании загружаемого файла на диск
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Временная директория уже создана этим процессом
+_temp_dir_ready = False
+
+
+def iso_from_epoch(timestamp: Union[int, float, str, None]) -> str:
+    """
+    Форматирует время загрузки из сессии в ISO 8601 (UTC) для ответа клиенту.
+    В сессии время хранится числом секунд Unix epoch; строки (старый формат)
+    возвращаются как есть.
+    
+    :param timestamp: Время в секундах Unix epoch
+    :return: Строка ISO 8601 или пустая строка, если время не задано
+    """
+    if timestamp is None or timestamp == "":
+        return ""
+    if isinstance(timestamp, str):
+        return timestamp
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def _copy_file_sync(source: BinaryIO, destination_path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> int:
+    """
+    Копирует файловый объект на диск блоками через один переиспользуемый буфер.
+    Выполняется в отдельном потоке целиком, а не по одному переходу в пул на блок.
+    
+    :param source: Исходный файловый объект (UploadFile.file)
+    :param destination_path: Путь к создаваемому файлу
+    :param chunk_size: Размер блока в байтах
+    :return: Количество записанных байт
+    """
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    written = 0
+    
+    with open(destination_path, "wb") as destination:
+        while True:
+            size = source.readinto(buffer)
+            if not size:
+                break
+            destination.write(view[:size])
+            written += size
+    
+    return written
+
+
+async def _remove_file(file_path: str) -> None:
+    """
+    Удаляет файл. На локальной ФС unlink - один быстрый системный вызов, поэтому
+    он выполняется сразу, без перехода в пул потоков; на сетевой ФС (TEMP_DIR_IS_NETWORK)
+    вызов может занять заметное время и выполняется в потоке.
+    
+    :param file_path: Путь к файлу
+    :raises OSError: Если файл не удалось удалить
+    """
+    if settings.TEMP_DIR_IS_NETWORK:
+        await asyncio.to_thread(os.remove, file_path)
+    else:
+        os.remove(file_path)
+
 
 class FileUploadService:
     """Сервис для загрузки и обработки файлов."""
     
-    async def save_uploaded_file(self, file, session: Dict[str, Any]) -> tuple[str, str]:
+    def _allocate_temp_file(self, content_type: Optional[str]) -> tuple[str, str]:
         """
-        Сохраняет загруженный файл во временную директорию.
+        Создает при необходимости временную директорию и формирует путь для нового файла.
         
-        :param file: Загруженный файл
-        :param session: Сессия пользователя
+        :param content_type: MIME тип файла
         :return: (file_id, temp_file_path)
         """
+        global _temp_dir_ready
         temp_dir = settings.TEMP_DIR
         
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
+        # Директория создается один раз за время жизни процесса
+        if not _temp_dir_ready:
+            os.makedirs(temp_dir, exist_ok=True)
+            _temp_dir_ready = True
         
-        file_id = uuid.uuid4().hex
-        file_ext = get_file_extension_by_content_type(
-            file.content_type if file.content_type else ""
-        )
+        file_id = secrets.token_hex(16)
+        file_ext = get_file_extension_by_content_type(content_type)
         
         file_tmp_name = f"{file_id}.{file_ext}" if file_ext else file_id
-        temp_file_path = os.path.join(temp_dir, file_tmp_name)
-        
-        # Асинхронная запись файла
-        async with aiofiles.open(temp_file_path, "wb") as temp_file:
-            content = await file.read()
-            await temp_file.write(content)
-        
-        logger.info(f"File saved: {temp_file_path} (size: {file.size} bytes)")
-        
-        return file_id, temp_file_path
+        return file_id, os.path.join(temp_dir, file_tmp_name)
     
-    async def save_uploaded_file_from_bytes(
-        self, content: bytes, metadata: Dict[str, Any], session: Dict[str, Any]
-    ) -> tuple[str, str]:
+    async def save_uploaded_file(self, file, session: Dict[str, Any]) -> tuple[str, str, str, int]:
         """
-        Сохраняет файл из bytes во временную директорию.
-        Используется для StreamingResponse, где файл нужно прочитать заранее.
+        Сохраняет загруженный файл во временную директорию.
+        Файл копируется блоками в одном потоке пула, не загружаясь в память целиком.
         
-        :param content: Содержимое файла в bytes
-        :param metadata: Метаданные файла (content_type, filename, size)
+        :param file: Загруженный файл
         :param session: Сессия пользователя
-        :return: (file_id, temp_file_path)
+        :return: (file_id, temp_file_path, file_name_without_ext, size) - имя исходного файла
+                 без расширения (file_id, если имя не передано) и число записанных байт
+        :raises OSError: Если файл не удалось записать (частично записанный файл удаляется)
         """
-        temp_dir = settings.TEMP_DIR
-        
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
-        
-        file_id = uuid.uuid4().hex
-        content_type = metadata.get("content_type", "")
-        file_ext = get_file_extension_by_content_type(content_type)
+        file_id, temp_file_path = self._allocate_temp_file(file.content_type)
         
-        file_tmp_name = f"{file_id}.{file_ext}" if file_ext else file_id
-        temp_file_path = os.path.join(temp_dir, file_tmp_name)
+        try:
+            written = await asyncio.to_thread(_copy_file_sync, file.file, temp_file_path)
+        except BaseException:
+            # Частично записанный файл (обрыв соединения, нет места на диске,
+            # отмена запроса) не должен оставаться во временной директории
+            try:
+                os.remove(temp_file_path)
+            except OSError:
+                pass
+            raise
         
-        # Асинхронная запись файла
-        async with aiofiles.open(temp_file_path, "wb") as temp_file:
-            await temp_file.write(content)
+        logger.info(f"File saved: {temp_file_path} (size: {written} bytes)")
         
-        file_size = metadata.get("size") or len(content)
-        logger.info(f"File saved from bytes: {temp_file_path} (size: {file_size} bytes)")
+        file_name_without_ext = os.path.splitext(file.filename)[0] if file.filename else file_id
         
-        return file_id, temp_file_path
+        return file_id, temp_file_path, file_name_without_ext, written
     
     async def cleanup_previous_file(self, session: Dict[str, Any]) -> None:
         """Удаляет предыдущий файл из сессии."""
         if session.get('last_uploaded_file'):
             previous_file_path = session['last_uploaded_file'].get("file_path", "")
             
-            if previous_file_path and os.path.exists(previous_file_path):
+            if previous_file_path:
                 try:
-                    await asyncio.to_thread(os.remove, previous_file_path)
+                    await _remove_file(previous_file_path)
                     session['last_uploaded_file'] = None
                     logger.info(f"Previous file removed: {previous_file_path}")
+                except FileNotFoundError:
+                    pass
                 except Exception as e:
                     logger.warning(
                         f"Failed to remove previous file {previous_file_path}: {e}"
@@ -95,14 +153,23 @@ class FileUploadService:
     
     async def cleanup_temp_file(self, file_path: str, session: Dict[str, Any]) -> None:
         """Удаляет временный файл при ошибке."""
-        if file_path and os.path.exists(file_path):
+        await self.discard_file(file_path)
+        session['last_uploaded_file'] = None
+    
+    async def discard_file(self, file_path: str) -> None:
+        """
+        Удаляет временный файл, не изменяя сессию.
+        
+        :param file_path: Путь к файлу
+        """
+        if file_path:
             try:
-                await asyncio.to_thread(os.remove, file_path)
+                await _remove_file(file_path)
                 logger.info(f"Temp file removed: {file_path}")
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 logger.warning(f"Failed to remove temp file {file_path}: {e}")
-        
-        session['last_uploaded_file'] = None
     
     def validate_session_state(self, session: Dict[str, Any]) -> Optional[str]:
         """
@@ -128,5 +195,6 @@ class FileUploadService:
             "file_path": file_path,
             "content_type": content_type,
             "size": size,
-            "upload_time": datetime.now(timezone.utc).isoformat()
+            # Время хранится числом; в ISO строку оно переводится только при ответе клиенту
+            "upload_time": int(time.time())
         }
@@ -13,19 +13,44 @@ import sys
 from src.transport.rabbitmq.consumer import RPCConsumer
 from src.transport.rabbitmq.connection import ConnectionManager
 from src.transport.json_rpc.dispatcher import JSONRPCDispatcher
+from src.config.app_config import settings
 from src.config.rabbitmq_config import rabbitmq_settings
 from src.config.logging_config import setup_logging
+from src.utils.files_utils import cleanup_orphaned_files
 
 # Настраиваем логирование
 setup_logging()
 logger = logging.getLogger(__name__)
 
 
+async def periodic_temp_cleanup():
+    """
+    Периодически удаляет "осиротевшие" файлы из TEMP_DIR.
+    Файлы остаются, если процесс упал посреди загрузки или обработки; без очистки
+    они копились бы до следующего перезапуска приложения.
+    Интервал и возраст файлов настраиваются через TEMP_CLEANUP_INTERVAL_MINUTES и TEMP_MAX_AGE_HOURS.
+    """
+    cleanup_interval = settings.TEMP_CLEANUP_INTERVAL_MINUTES * 60  # Минуты в секунды
+    logger.info(f"Periodic temp cleanup task started (interval: {cleanup_interval}s, max age: {settings.TEMP_MAX_AGE_HOURS}h)")
+    
+    while True:
+        try:
+            await asyncio.sleep(cleanup_interval)
+            # Обход директории и удаление выполняются в потоке, не блокируя обработку сообщений
+            await asyncio.to_thread(
+                cleanup_orphaned_files, settings.TEMP_DIR, settings.TEMP_MAX_AGE_HOURS
+            )
+        except Exception as e:
+            logger.error(f"Error in periodic temp cleanup: {e}", exc_info=True)
+
+
 async def main():
     """
     Главная функция запуска воркера.
     Инициализирует все компоненты и запускает консьюмер.
     """
+    cleanup_task = None
+    
     try:
         logger.info("=" * 60)
         logger.info("Starting RabbitMQ Worker")
@@ -48,6 +73,9 @@ async def main():
         logger.info("Waiting for RPC requests... Press Ctrl+C to stop.")
         logger.info("=" * 60)
         
+        # Фоновая очистка временной директории
+        cleanup_task = asyncio.create_task(periodic_temp_cleanup())
+        
         # Запускаем консьюмер (блокирует выполнение)
         await consumer.start_consuming()
     
@@ -62,6 +90,8 @@ async def main():
         sys.exit(1)
     
     finally:
+        if cleanup_task is not None:
+            cleanup_task.cancel()
         logger.info("RabbitMQ Worker stopped.")
 
 
@@ -3,6 +3,7 @@
 Демонстрирует работу автообнаружения сервисов и обработки RPC запросов.
 """
 
+import asyncio
 import json
 import logging
 import sys
@@ -23,7 +24,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def test_dispatcher():
+async def test_dispatcher():
     """Тестирует работу JSON-RPC диспетчера"""
     
     print("=" * 80)
@@ -61,7 +62,7 @@ def test_dispatcher():
     print(f"Request: {json.dumps(request_1, indent=2)}")
     
     try:
-        response_1 = dispatcher.handle_request(json.dumps(request_1))
+        response_1 = await dispatcher.handle_request(json.dumps(request_1))
         print(f"Response: {response_1}")
     except Exception as e:
         print(f"Error: {e}")
@@ -83,7 +84,7 @@ def test_dispatcher():
     print(f"Request: {json.dumps(request_2, indent=2)}")
     
     try:
-        response_2 = dispatcher.handle_request(json.dumps(request_2))
+        response_2 = await dispatcher.handle_request(json.dumps(request_2))
         print(f"Response: {response_2}")
     except Exception as e:
         print(f"Error: {e}")
@@ -102,7 +103,7 @@ def test_dispatcher():
     print(f"Request: {json.dumps(request_3, indent=2)}")
     
     try:
-        response_3 = dispatcher.handle_request(json.dumps(request_3))
+        response_3 = await dispatcher.handle_request(json.dumps(request_3))
         print(f"Response: {response_3}")
     except Exception as e:
         print(f"Error: {e}")
@@ -114,7 +115,7 @@ def test_dispatcher():
     print(f"Request: {request_4}")
     
     try:
-        response_4 = dispatcher.handle_request(request_4)
+        response_4 = await dispatcher.handle_request(request_4)
         print(f"Response: {response_4}")
     except Exception as e:
         print(f"Error: {e}")
@@ -125,4 +126,4 @@ def test_dispatcher():
 
 
 if __name__ == "__main__":
-    test_dispatcher()
+    asyncio.run(test_dispatcher())
@@ -1,17 +1,27 @@
 """
 Простой тест для проверки SSE upload endpoint
 """
-import asyncio
 import io
-from fastapi.testclient import TestClient
+import pytest
+from httpx import AsyncClient, ASGITransport
 from src.app import get_application
 
 
+def _event_type(event: bytes):
+    """Возвращает тип SSE события (строка event:) или None для комментариев."""
+    for line in event.split(b"\n"):
+        if line.startswith(b"event:"):
+            return line[len(b"event:"):].strip().decode()
+    return None
+
+
+@pytest.mark.asyncio
 async def test_sse_upload_basic():
     """Базовый тест SSE upload endpoint."""
     
     app = get_application()
-    client = TestClient(app)
+    # Приложение вызывается напрямую в том же event loop, без потока TestClient
+    transport = ASGITransport(app=app)
     
     # Создаем тестовый файл
     test_file_content = b"fake video content"
@@ -19,26 +29,42 @@ async def test_sse_upload_basic():
     
     print("Testing SSE upload endpoint...")
     
-    try:
+    events = []
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
         # Отправляем POST запрос на SSE endpoint
-        with client.stream("POST", "/files/upload/stream", files={"file": test_file}) as response:
+        async with client.stream("POST", "/files/upload/stream", files={"file": test_file}) as response:
             print(f"Response status: {response.status_code}")
             print(f"Content-Type: {response.headers.get('content-type')}")
             
-            # Читаем первые несколько SSE событий
-            events_count = 0
-            for line in response.iter_lines():
-                if line:
-                    print(f"SSE Line: {line}")
-                    events_count += 1
-                    if events_count >= 10:  # Ограничиваем количество для теста
-                        break
+            assert response.status_code == 200, f"Unexpected status: {response.status_code}"
+            assert response.headers.get("content-type", "").startswith("text/event-stream")
             
-            print(f"Received {events_count} SSE events")
-            
-    except Exception as e:
-        print(f"Error during test: {e}")
-
-
-if __name__ == "__main__":
-    asyncio.run(test_sse_upload_basic())
\ No newline at end of file
+            # Поток читается до завершающего события (complete/error) и закрывается явно
+            # сразу после него (и при ошибке), чтобы SSE генератор на сервере завершился
+            try:
+                # Поток делится на события по границе b"\n\n" без декодирования
+                # каждой строки; keep-alive комментарии пропускаются
+                buf = bytearray()
+                done = False
+                async for chunk in response.aiter_raw(chunk_size=4096):
+                    buf += chunk
+                    *frames, buf = buf.split(b"\n\n")
+                    for frame in frames:
+                        event_type = _event_type(bytes(frame))
+                        if event_type is None or event_type == "keep-alive":
+                            continue
+                        print(f"SSE Event: {bytes(frame).decode('utf-8', 'replace')}")
+                        events.append(event_type)
+                        if event_type in ("complete", "error"):
+                            done = True
+                            break
+                    if done:
+                        break
+            finally:
+                await response.aclose()
+    
+    print(f"Received {len(events)} SSE events")
+    
+    assert events, "No SSE events received"
+    assert "error" not in events, f"Stream reported an error: {events}"
+    assert events[-1] == "complete", f"Last event should be 'complete', got {events[-1]!r}"
@@ -3,29 +3,108 @@
 Проверка версий: CUDA, PyTorch, torchaudio, torchvision
 """
 
+import argparse
 import importlib
 import sys
+from importlib.metadata import version, PackageNotFoundError
 
 def try_import(name):
+    # Уже загруженный модуль берется из sys.modules без повторного прохода import machinery
+    mod = sys.modules.get(name)
+    if mod is not None:
+        return mod
     try:
         return importlib.import_module(name)
     except Exception as e:
         return None
 
+def pkg_ver(name):
+    # Версия читается из метаданных пакета (dist-info), без импорта модуля
+    # и без инициализации CUDA
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
 def fmt(val):
     return str(val) if val is not None else "не установлен / недоступно"
 
+def print_nvml_info():
+    # NVML обращается к драйверу напрямую: CUDA runtime не загружается,
+    # контекст на устройстве не создается и видеопамять не расходуется
+    pynvml = try_import("pynvml")
+    if pynvml is None:
+        print("NVML: pynvml не установлен (pip install nvidia-ml-py)")
+        return
+
+    try:
+        pynvml.nvmlInit()
+    except Exception as e:
+        print(f"NVML недоступен: {e}")
+        return
+
+    try:
+        driver_ver = pynvml.nvmlSystemGetDriverVersion()
+        if isinstance(driver_ver, bytes):
+            driver_ver = driver_ver.decode()
+        print(f"NVIDIA driver version: {fmt(driver_ver)}")
+
+        dev_count = pynvml.nvmlDeviceGetCount()
+        print(f"GPU device count (NVML): {dev_count}")
+
+        for idx in range(dev_count):
+            try:
+                handle = pynvml.nvmlDeviceGetHandleByIndex(idx)
+                name = pynvml.nvmlDeviceGetName(handle)
+                # Старые версии pynvml возвращают bytes
+                if isinstance(name, bytes):
+                    name = name.decode()
+                major, minor = pynvml.nvmlDeviceGetCudaComputeCapability(handle)
+                total_mem = pynvml.nvmlDeviceGetMemoryInfo(handle).total
+                print(f"GPU {idx}: {name}")
+                print(f"  Compute capability: {major}.{minor}")
+                print(f"  Total device memory: {total_mem >> 20} MB")
+            except Exception as e:
+                print(f"Информация о GPU {idx} недоступна: {e}")
+    finally:
+        pynvml.nvmlShutdown()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--deep",
+        action="store_true",
+        help="дополнительно импортировать torch и показать информацию о CUDA runtime "
+             "(инициализирует CUDA и занимает видеопамять)"
+    )
+    return parser.parse_args()
+
 def main():
-    torch = try_import("torch")
-    torchaudio = try_import("torchaudio")
-    torchvision = try_import("torchvision")
+    args = parse_args()
+
+    torch_ver = pkg_ver("torch")
+    # torchaudio и torchvision без torch не работают, поэтому без него не проверяются
+    if torch_ver is None:
+        torchaudio_ver = torchvision_ver = None
+    else:
+        torchaudio_ver = pkg_ver("torchaudio")
+        torchvision_ver = pkg_ver("torchvision")
 
     print("=== PyTorch / CUDA / related info ===\n")
 
-    if torch is None:
+    if torch_ver is None:
         print("torch: НЕ УСТАНОВЛЕН")
     else:
-        print(f"torch.__version__: {fmt(torch.__version__)}")
+        print(f"torch version: {fmt(torch_ver)}")
+
+    print("\n=== GPU (NVML) ===")
+    print_nvml_info()
+
+    # Импорт torch загружает CUDA библиотеки, поэтому выполняется только по запросу
+    torch = try_import("torch") if args.deep and torch_ver is not None else None
+
+    if torch is not None:
+        print("\n=== CUDA runtime (torch) ===")
 
         # CUDA runtime version reported by PyTorch (string or None)
         cuda_ver = getattr(torch.version, "cuda", None)
@@ -43,26 +122,27 @@ def main():
             try:
                 dev_count = torch.cuda.device_count()
             except Exception:
-                dev_count = "unknown"
+                dev_count = 0
             print(f"CUDA device count: {fmt(dev_count)}")
 
             try:
-                cur = torch.cuda.current_device()
-                name = torch.cuda.get_device_name(cur)
-                props = torch.cuda.get_device_properties(cur)
-                cc = f"{props.major}.{props.minor}" if hasattr(props, "major") else "unknown"
-                total_mem = getattr(props, "total_memory", None)
-                if total_mem:
-                    total_mem_mb = int(total_mem / (1024**2))
-                    mem_str = f"{total_mem_mb} MB"
-                else:
-                    mem_str = "unknown"
-                print(f"Current CUDA device index: {cur}")
-                print(f"Current CUDA device name: {name}")
-                print(f"Compute capability: {cc}")
-                print(f"Total device memory: {mem_str}")
+                print(f"Current CUDA device index: {torch.cuda.current_device()}")
             except Exception as e:
-                print(f"Информация о CUDA-устройстве недоступна: {e}")
+                print(f"Текущее CUDA-устройство недоступно: {e}")
+
+            for idx in range(dev_count):
+                try:
+                    # Имя, compute capability и память берутся из одной структуры
+                    # свойств, а не отдельными вызовами runtime
+                    props = torch.cuda.get_device_properties(idx)
+                    cc = f"{props.major}.{props.minor}" if hasattr(props, "major") else "unknown"
+                    total_mem = getattr(props, "total_memory", None)
+                    mem_str = f"{total_mem >> 20} MB" if total_mem else "unknown"
+                    print(f"CUDA device {idx} name: {props.name}")
+                    print(f"  Compute capability: {cc}")
+                    print(f"  Total device memory: {mem_str}")
+                except Exception as e:
+                    print(f"Информация о CUDA-устройстве {idx} недоступна: {e}")
 
         # cuDNN
         try:
@@ -70,21 +150,20 @@ def main():
         except Exception:
             cudnn_ver = None
         print(f"torch.backends.cudnn.version(): {fmt(cudnn_ver)}")
+    elif torch_ver is not None and not args.deep:
+        print("Информация о CUDA runtime: запустите с флагом --deep")
 
     print("\n=== torchaudio ===")
-    if torchaudio is None:
+    if torchaudio_ver is None:
         print("torchaudio: НЕ УСТАНОВЛЕН")
     else:
-        # Some torchaudio versions expose __version__, older might not
-        ver = getattr(torchaudio, "__version__", None)
-        print(f"torchaudio.__version__: {fmt(ver)}")
+        print(f"torchaudio version: {fmt(torchaudio_ver)}")
 
     print("\n=== torchvision ===")
-    if torchvision is None:
+    if torchvision_ver is None:
         print("torchvision: НЕ УСТАНОВЛЕН")
     else:
-        ver = getattr(torchvision, "__version__", None)
-        print(f"torchvision.__version__: {fmt(ver)}")
+        print(f"torchvision version: {fmt(torchvision_ver)}")
 
     print("\n=== Доп. советы ===")
     print("Если хотите также увидеть версию установленного nvcc (CUDA toolkit), выполните в терминале:")